@@ -48,22 +48,30 @@ def run_all_cleanups():
 @router.get("/datasets/old")
 def list_old_datasets(days_old: int = 1, db: Session = Depends(get_db)):
     """List datasets older than specified days (for testing)"""
-    cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+    now = datetime.utcnow()
+    cutoff_date = now - timedelta(days=days_old)
     
-    old_datasets = db.query(DatasetMetadata).filter(
+    # Only the listed columns are selected and rows are streamed in batches instead of loading full records
+    old_datasets = db.query(
+        DatasetMetadata.id,
+        DatasetMetadata.filename,
+        DatasetMetadata.upload_timestamp
+    ).filter(
         DatasetMetadata.upload_timestamp < cutoff_date
-    ).all()
+    ).yield_per(1000)
+    
+    datasets = [
+        {
+            "id": ds.id,
+            "filename": ds.filename,
+            "uploaded": ds.upload_timestamp.isoformat(),
+            "age_days": (now - ds.upload_timestamp).days
+        }
+        for ds in old_datasets
+    ]
     
     return {
         "cutoff_date": cutoff_date.isoformat(),
-        "count": len(old_datasets),
-        "datasets": [
-            {
-                "id": ds.id,
-                "filename": ds.filename,
-                "uploaded": ds.upload_timestamp.isoformat(),
-                "age_days": (datetime.utcnow() - ds.upload_timestamp).days
-            }
-            for ds in old_datasets
-        ]
+        "count": len(datasets),
+        "datasets": datasets
     }
@@ -4,19 +4,37 @@ from sqlalchemy.orm import Session
 import pandas as pd
 import numpy as np
 import os
+import asyncio
 import json
+import re
+import hashlib
+import threading
+from bisect import bisect_left
+from cachetools import TTLCache
 from typing import List, Dict, Optional, Union
 from datetime import datetime
 from app.core.database import get_db
 from app.core.config import settings
-from app.models.database_models import DatasetMetadata
-from app.services.llm_engine.ollama_client import OllamaClient
+from app.services.llm_engine.ollama_client import OllamaStreamError, get_ollama_client
+from app.services import dataset_cache, lookups
+from app.utils.helpers import run_blocking
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
 from scipy import stats
 
 router = APIRouter()
 
+# Characters that change the suggestion parser's state inside and outside JSON strings
+_STRING_SPECIAL = re.compile(r'["\\]')
+_OBJECT_SPECIAL = re.compile(r'["{}]')
+
+# Charts that plot individual points are drawn from at most this many rows
+PLOT_ROW_CAP = 50_000
+
+# fig.to_json() dominates chart building; orjson serializes numpy arrays natively
+pio.json.config.default_engine = 'orjson'
+
 # Define all supported chart types
 SUPPORTED_CHART_TYPES = {
     'histogram': 'Distribution of a single numeric variable',
@@ -70,26 +88,30 @@ class DashboardResponse(BaseModel):
     analysis: str
     dashboard_id: str
 
-ollama_client = OllamaClient()
+ollama_client = get_ollama_client()
+
+# Serialized chart JSON keyed by dataset version and chart spec, so refreshes skip rebuilding figures
+chart_json_cache = TTLCache(maxsize=settings.CHART_CACHE_SIZE, ttl=settings.CHART_CACHE_TTL)
+chart_json_cache_lock = threading.Lock()
 
 @router.post("/generate", response_model=DashboardResponse)
 async def generate_dashboard(request: DashboardRequest, db: Session = Depends(get_db)):
     """Generate AI-powered dashboard with charts and metric cards"""
     
-    dataset = db.query(DatasetMetadata).filter(DatasetMetadata.id == request.dataset_id).first()
+    dataset = lookups.get_dataset(db, request.dataset_id)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     file_path = os.path.join(settings.UPLOAD_DIR, dataset.filename)
     
-    if dataset.filename.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    else:
-        df = pd.read_excel(file_path)
+    df = await run_blocking(dataset_cache.get_dataframe, dataset.id, file_path)
+    profile = await run_blocking(dataset_cache.get_profile, dataset.id, file_path)
+    dataset_version = (dataset.id, dataset_cache.get_version(dataset.id, file_path))
     
-    sample_data = df.head(10)
-    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    # Capped at 20 columns so very wide frames do not blow up the prompt
+    sample_data = df.iloc[:10, :20]
+    numeric_cols = profile['numeric_cols']
+    categorical_cols = profile['categorical_cols']
     
     chart_types_description = "\n".join([f"  - {k}: {v}" for k, v in SUPPORTED_CHART_TYPES.items()])
     
@@ -115,21 +137,16 @@ Name: {dataset.filename}
 Rows: {len(df)} | Columns: {len(df.columns)}
 
 Column Details:
-{json.dumps({col: {
-    'type': str(df[col].dtype), 
-    'unique': int(df[col].nunique()), 
-    'missing': int(df[col].isnull().sum()),
-    'sample': df[col].dropna().head(3).tolist()
-} for col in df.columns}, indent=2)}
+{json.dumps(profile['columns'], indent=2)}
 
 Numeric: {', '.join(numeric_cols)}
 Categorical: {', '.join(categorical_cols)}
 
 First 10 Rows:
-{sample_data.to_string()}
+{sample_data.to_csv(index=False)}
 
 Stats:
-{df[numeric_cols].describe().to_string() if numeric_cols else 'No numeric columns'}
+{profile['describe'].round(3).to_csv() if numeric_cols else 'No numeric columns'}
 
 USER REQUEST: "{user_preference}"
 
@@ -170,66 +187,64 @@ EXAMPLES:
 - Category Breakdown: bar or pie chart
 """
     
+    # Every task started below is cancelled on the way out unless it finished, so a disconnect or failure
+    # mid-stream never leaves a generation holding an Ollama slot for a result nobody reads
+    pending_tasks = []
     try:
-        result = await ollama_client.generate(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            temperature=0.4,
-            max_tokens=3500
-        )
-        
-        response_text = result.get('response', '')
-        
-        import re
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        
-        if json_match:
-            suggestions = json.loads(json_match.group())
-        else:
-            suggestions = generate_fallback_suggestions(df, numeric_cols, categorical_cols, user_preference)
-        
-        items = []
-        for suggestion in suggestions:
-            try:
-                if suggestion.get('type') == 'metric_card':
-                    metric = generate_metric_card(df, suggestion)
-                    items.append(ChartData(
-                        type='metric_card',
-                        title=suggestion['title'],
-                        plotly_json=None,
-                        description=suggestion.get('description', ''),
-                        metric_card=metric
-                    ))
-                else:
-                    chart_fig = generate_plotly_chart(df, suggestion, categorical_cols)
-                    items.append(ChartData(
-                        type=suggestion['type'],
-                        title=suggestion['title'],
-                        plotly_json=chart_fig.to_json(),
-                        description=suggestion.get('description', ''),
-                        color_scheme=suggestion.get('color_scheme', 'viridis'),
-                        metric_card=None
-                    ))
-            except Exception as e:
-                print(f"Failed to generate item {suggestion.get('type', 'unknown')}: {e}")
-                continue
-        
         analysis_prompt = f"""Dataset: {len(df)} rows, {len(df.columns)} columns
+Numeric: {', '.join(numeric_cols)}
+Categorical: {', '.join(categorical_cols)}
 User: "{user_preference}"
-Generated {len(items)} items ({sum(1 for i in items if i.type == 'metric_card')} metrics, {sum(1 for i in items if i.type != 'metric_card')} charts)
 
 Provide 4-5 sentence analysis covering:
-1. Key findings from metrics and visualizations
+1. Key findings to look for in metrics and visualizations
 2. How they address user's request
 3. Notable patterns or insights
 4. Actionable recommendations"""
-        
-        analysis_result = await ollama_client.generate(
+
+        # The analysis depends only on the dataset and request, so both generations are in flight together
+        analysis_task = asyncio.create_task(ollama_client.generate(
             prompt=analysis_prompt,
             system_prompt="Senior data analyst. Clear, actionable insights.",
             temperature=0.6,
             max_tokens=400
-        )
+        ))
+        pending_tasks.append(analysis_task)
+        
+        # Charts on the same columns share one cleaned copy instead of each re-filtering the frame
+        clean_frames = CleanFrames(df)
+        parser = SuggestionStreamParser()
+        suggestions = []
+        item_tasks = []
+        
+        try:
+            async for fragment in ollama_client.generate_stream(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.4,
+                max_tokens=3500
+            ):
+                # Each suggestion starts building as soon as its object closes, while the model keeps decoding
+                for suggestion in parser.feed(fragment):
+                    suggestions.append(suggestion)
+                    item_tasks.append(asyncio.create_task(
+                        run_blocking(build_dashboard_item, df, suggestion, categorical_cols, dataset_version, clean_frames)
+                    ))
+                    pending_tasks.append(item_tasks[-1])
+        except OllamaStreamError as e:
+            # Every suggestion that closed before the cut is complete, so the dashboard is built from those
+            print(f"Suggestion stream cut off after {len(suggestions)} suggestions: {e}")
+        
+        if not suggestions:
+            suggestions = generate_fallback_suggestions(df, numeric_cols, categorical_cols, user_preference)
+            item_tasks = [
+                asyncio.create_task(run_blocking(build_dashboard_item, df, suggestion, categorical_cols, dataset_version, clean_frames))
+                for suggestion in suggestions
+            ]
+            pending_tasks.extend(item_tasks)
+        
+        built_items, analysis_result = await asyncio.gather(asyncio.gather(*item_tasks), analysis_task)
+        items = [item for item in built_items if item is not None]
         
         dashboard_id = f"dashboard_{request.dataset_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
@@ -242,6 +257,22 @@ Provide 4-5 sentence analysis covering:
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Dashboard generation failed: {str(e)}")
+    finally:
+        for task in pending_tasks:
+            if not task.done():
+                task.cancel()
+
+# A value must exceed a threshold to be shown scaled down by it with the matching suffix
+METRIC_THRESHOLDS = (1_000, 1_000_000, 1_000_000_000, 1_000_000_000_000)
+METRIC_SUFFIXES = ('', 'K', 'M', 'B', 'T')
+
+def format_metric_value(value):
+    """Abbreviate a metric value; floats keep two decimals, scaled counts one"""
+    magnitude = bisect_left(METRIC_THRESHOLDS, value)
+    if magnitude == 0:
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+    decimals = 2 if isinstance(value, float) else 1
+    return f"{value / METRIC_THRESHOLDS[magnitude - 1]:.{decimals}f}{METRIC_SUFFIXES[magnitude]}"
 
 def generate_metric_card(df, suggestion):
     """Generate metric card with calculated value"""
@@ -268,21 +299,7 @@ def generate_metric_card(df, suggestion):
         else:
             value = len(df)
         
-        # Format value
-        if isinstance(value, float):
-            if value > 1000000:
-                formatted_value = f"{value/1000000:.2f}M"
-            elif value > 1000:
-                formatted_value = f"{value/1000:.2f}K"
-            else:
-                formatted_value = f"{value:.2f}"
-        else:
-            if value > 1000000:
-                formatted_value = f"{value/1000000:.1f}M"
-            elif value > 1000:
-                formatted_value = f"{value/1000:.1f}K"
-            else:
-                formatted_value = str(value)
+        formatted_value = format_metric_value(value)
         
         return MetricCard(
             metric_type=metric_type,
@@ -302,7 +319,187 @@ def generate_metric_card(df, suggestion):
             description='Could not calculate'
         )
 
-def generate_plotly_chart(df, suggestion, categorical_cols=None):
+# Chart renderers take the prepared chart context as keywords and ignore what they do not use
+def _chart_histogram(plot_df, clean_frames, x_col, title, colors_to_use, **_):
+    clean_data = clean_frames.get(x_col)[x_col]
+    if len(clean_data) == 0:
+        raise ValueError(f"No valid data in {x_col}")
+    fig = px.histogram(plot_df[plot_df[x_col].notna()], x=x_col, title=title, color_discrete_sequence=colors_to_use, nbins=min(30, len(clean_data) // 5))
+    fig.update_traces(marker_line_width=1, marker_line_color="white")
+    return fig
+
+def _chart_scatter(df, plot_df, clean_frames, x_col, y_col, title, colors_to_use, **_):
+    can_add_trendline = False
+    if y_col and x_col in df.columns and y_col in df.columns:
+        if df[x_col].dtype in ['int64', 'float64'] and df[y_col].dtype in ['int64', 'float64']:
+            valid_data = clean_frames.get(x_col, y_col)
+            if len(valid_data) >= 3:
+                if valid_data[x_col].var() > 1e-10 and valid_data[y_col].var() > 1e-10:
+                    can_add_trendline = True
+    try:
+        fig = px.scatter(plot_df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use, trendline="ols" if can_add_trendline else None)
+    except:
+        fig = px.scatter(plot_df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_bar(clean_frames, x_col, title, color_scheme, **_):
+    value_counts = clean_frames.value_counts(x_col).head(15)
+    fig = px.bar(x=value_counts.index, y=value_counts.values, title=title, labels={'x': x_col, 'y': 'Count'}, color=value_counts.values, color_continuous_scale=color_scheme)
+    return fig
+
+def _chart_box(plot_df, x_col, title, colors_to_use, **_):
+    fig = px.box(plot_df[plot_df[x_col].notna()], y=x_col, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_violin(plot_df, x_col, title, colors_to_use, **_):
+    fig = px.violin(plot_df[plot_df[x_col].notna()], y=x_col, title=title, box=True, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_heatmap(df, title, color_scheme, **_):
+    correlation = correlation_matrix(df, numeric_columns(df))
+    fig = px.imshow(correlation, title=title, color_continuous_scale=color_scheme, text_auto='.2f', aspect='auto')
+    return fig
+
+def _chart_line(clean_frames, x_col, y_col, title, colors_to_use, **_):
+    # Line and area charts keep every n-th row so the trend's ordering survives downsampling
+    clean_df = clean_frames.get(x_col, y_col, rows='stride') if y_col else clean_frames.get(x_col, rows='stride')
+    fig = px.line(clean_df, x=clean_df.index if x_col == 'index' else x_col, y=y_col if y_col else x_col, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_pie(clean_frames, x_col, title, colors_to_use, **_):
+    value_counts = clean_frames.value_counts(x_col).head(10)
+    fig = px.pie(values=value_counts.values, names=value_counts.index, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_area(clean_frames, x_col, y_col, title, colors_to_use, **_):
+    clean_df = clean_frames.get(x_col, y_col, rows='stride')
+    fig = px.area(clean_df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_bubble(plot_df, clean_frames, x_col, y_col, z_col, title, colors_to_use, **_):
+    if z_col:
+        clean_df = clean_frames.get(x_col, y_col, z_col)
+        fig = px.scatter(clean_df, x=x_col, y=y_col, size=z_col, title=title, color_discrete_sequence=colors_to_use)
+    else:
+        fig = px.scatter(plot_df, x=x_col, y=y_col, title=title)
+    return fig
+
+def _chart_density_contour(clean_frames, x_col, y_col, title, colors_to_use, **_):
+    clean_df = clean_frames.get(x_col, y_col)
+    fig = px.density_contour(clean_df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use)
+    fig.update_traces(contours_coloring="fill", contours_showlabels=True)
+    return fig
+
+def _chart_density_heatmap(clean_frames, x_col, y_col, title, color_scheme, **_):
+    clean_df = clean_frames.get(x_col, y_col)
+    fig = px.density_heatmap(clean_df, x=x_col, y=y_col, title=title, color_continuous_scale=color_scheme)
+    return fig
+
+def _chart_sunburst(df, clean_frames, x_col, y_col, title, colors_to_use, **_):
+    if y_col:
+        fig = px.sunburst(df[[x_col, y_col]].dropna(), path=[x_col, y_col], title=title, color_discrete_sequence=colors_to_use)
+    else:
+        value_counts = clean_frames.value_counts(x_col)
+        fig = px.sunburst(names=value_counts.index, values=value_counts.values, title=title)
+    return fig
+
+def _chart_treemap(df, clean_frames, x_col, y_col, title, colors_to_use, **_):
+    if y_col:
+        fig = px.treemap(df[[x_col, y_col]].dropna(), path=[x_col, y_col], title=title, color_discrete_sequence=colors_to_use)
+    else:
+        value_counts = clean_frames.value_counts(x_col)
+        fig = px.treemap(names=value_counts.index, values=value_counts.values, title=title)
+    return fig
+
+def _chart_funnel(clean_frames, x_col, title, colors_to_use, **_):
+    value_counts = clean_frames.value_counts(x_col).head(10)
+    fig = px.funnel(y=value_counts.index, x=value_counts.values, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_waterfall(clean_frames, x_col, y_col, title, **_):
+    if y_col:
+        clean_df = clean_frames.get(x_col, y_col, rows='all').head(20)
+        fig = go.Figure(go.Waterfall(x=clean_df[x_col], y=clean_df[y_col], name=title))
+        fig.update_layout(title=title)
+    else:
+        fig = go.Figure()
+        fig.update_layout(title=f"{title} (requires x and y columns)")
+    return fig
+
+def _chart_parallel_coordinates(clean_frames, title, color_scheme, **_):
+    numeric_df = clean_frames.numeric().dropna().head(100)
+    fig = px.parallel_coordinates(numeric_df, title=title, color_continuous_scale=color_scheme)
+    return fig
+
+def _chart_parallel_categories(df, title, color_scheme, categorical_cols, **_):
+    if len(categorical_cols) < 2:
+        raise ValueError("Needs at least two categorical columns")
+    cat_df = df[categorical_cols[:4]].dropna().head(100)
+    fig = px.parallel_categories(cat_df, title=title, color_continuous_scale=color_scheme)
+    return fig
+
+def _chart_strip(clean_frames, x_col, y_col, title, colors_to_use, **_):
+    clean_df = clean_frames.get(x_col, y_col if y_col else x_col)
+    fig = px.strip(clean_df, x=x_col, y=y_col if y_col else x_col, title=title, color_discrete_sequence=colors_to_use)
+    return fig
+
+def _chart_qqplot(clean_frames, x_col, title, **_):
+    data = clean_frames.get(x_col)[x_col]
+    qq = stats.probplot(data, dist="norm")
+    fig = go.Figure()
+    fig.add_scatter(x=qq[0][0], y=qq[0][1], mode='markers', name='Data')
+    fig.add_scatter(x=qq[0][0], y=qq[0][0] * qq[1][0] + qq[1][1], mode='lines', name='Fit', line=dict(color='red'))
+    fig.update_layout(title=title, xaxis_title='Theoretical Quantiles', yaxis_title='Sample Quantiles')
+    return fig
+
+def _chart_ecdf(clean_frames, x_col, title, **_):
+    data = clean_frames.get(x_col)[x_col]
+    data_sorted = np.sort(data)
+    ecdf = np.arange(1, len(data_sorted) + 1) / len(data_sorted)
+    fig = go.Figure(go.Scatter(x=data_sorted, y=ecdf, mode='lines'))
+    fig.update_layout(title=title, xaxis_title=x_col, yaxis_title='ECDF')
+    return fig
+
+def _chart_3d_scatter(clean_frames, x_col, y_col, z_col, title, colors_to_use, **_):
+    if y_col and z_col:
+        clean_df = clean_frames.get(x_col, y_col, z_col)
+        fig = px.scatter_3d(clean_df, x=x_col, y=y_col, z=z_col, title=title, color_discrete_sequence=colors_to_use)
+    else:
+        fig = go.Figure()
+        fig.update_layout(title=f"{title} (requires x, y, z columns)")
+    return fig
+
+def _chart_fallback(plot_df, x_col, title, **_):
+    """Histogram of x_column for chart types without a dedicated renderer"""
+    fig = px.histogram(plot_df[plot_df[x_col].notna()], x=x_col, title=f"{title} (fallback)")
+    return fig
+
+CHART_DISPATCH = {
+    'histogram': _chart_histogram,
+    'scatter': _chart_scatter,
+    'bar': _chart_bar,
+    'box': _chart_box,
+    'violin': _chart_violin,
+    'heatmap': _chart_heatmap,
+    'line': _chart_line,
+    'pie': _chart_pie,
+    'area': _chart_area,
+    'bubble': _chart_bubble,
+    'density_contour': _chart_density_contour,
+    'density_heatmap': _chart_density_heatmap,
+    'sunburst': _chart_sunburst,
+    'treemap': _chart_treemap,
+    'funnel': _chart_funnel,
+    'waterfall': _chart_waterfall,
+    'parallel_coordinates': _chart_parallel_coordinates,
+    'parallel_categories': _chart_parallel_categories,
+    'strip': _chart_strip,
+    'qqplot': _chart_qqplot,
+    'ecdf': _chart_ecdf,
+    '3d_scatter': _chart_3d_scatter
+}
+
+def generate_plotly_chart(df, suggestion, categorical_cols=None, clean_frames=None):
     """Generate interactive Plotly chart with expanded chart types"""
     
     chart_type = suggestion['type']
@@ -314,6 +511,9 @@ def generate_plotly_chart(df, suggestion, categorical_cols=None):
     
     if categorical_cols is None:
         categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    if clean_frames is None:
+        clean_frames = CleanFrames(df)
+    plot_df = clean_frames.sample
     
     color_palettes = {
         'viridis': px.colors.sequential.Viridis,
@@ -329,134 +529,19 @@ def generate_plotly_chart(df, suggestion, categorical_cols=None):
     colors_to_use = color_palettes.get(color_scheme.lower(), px.colors.sequential.Viridis)
     
     try:
-        if chart_type == 'histogram':
-            clean_data = df[x_col].replace([np.inf, -np.inf], np.nan).dropna()
-            if len(clean_data) == 0:
-                raise ValueError(f"No valid data in {x_col}")
-            fig = px.histogram(df[df[x_col].notna()], x=x_col, title=title, color_discrete_sequence=colors_to_use, nbins=min(30, len(clean_data) // 5))
-            fig.update_traces(marker_line_width=1, marker_line_color="white")
-            
-        elif chart_type == 'scatter':
-            can_add_trendline = False
-            if y_col and x_col in df.columns and y_col in df.columns:
-                if df[x_col].dtype in ['int64', 'float64'] and df[y_col].dtype in ['int64', 'float64']:
-                    valid_data = df[[x_col, y_col]].replace([np.inf, -np.inf], np.nan).dropna()
-                    if len(valid_data) >= 3:
-                        if valid_data[x_col].var() > 1e-10 and valid_data[y_col].var() > 1e-10:
-                            can_add_trendline = True
-            try:
-                fig = px.scatter(df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use, trendline="ols" if can_add_trendline else None)
-            except:
-                fig = px.scatter(df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use)
-            
-        elif chart_type == 'bar':
-            value_counts = df[x_col].value_counts().head(15)
-            fig = px.bar(x=value_counts.index, y=value_counts.values, title=title, labels={'x': x_col, 'y': 'Count'}, color=value_counts.values, color_continuous_scale=color_scheme)
-            
-        elif chart_type == 'box':
-            fig = px.box(df[df[x_col].notna()], y=x_col, title=title, color_discrete_sequence=colors_to_use)
-            
-        elif chart_type == 'violin':
-            fig = px.violin(df[df[x_col].notna()], y=x_col, title=title, box=True, color_discrete_sequence=colors_to_use)
-            
-        elif chart_type == 'heatmap':
-            numeric_df = df.select_dtypes(include=['number']).replace([np.inf, -np.inf], np.nan).dropna(axis=1, how='all')
-            correlation = numeric_df.corr()
-            fig = px.imshow(correlation, title=title, color_continuous_scale=color_scheme, text_auto='.2f', aspect='auto')
-        
-        elif chart_type == 'line':
-            clean_df = df[[x_col, y_col]].replace([np.inf, -np.inf], np.nan).dropna() if y_col else df[[x_col]].replace([np.inf, -np.inf], np.nan).dropna()
-            fig = px.line(clean_df, x=clean_df.index if x_col == 'index' else x_col, y=y_col if y_col else x_col, title=title, color_discrete_sequence=colors_to_use)
-            
-        elif chart_type == 'pie':
-            value_counts = df[x_col].value_counts().head(10)
-            fig = px.pie(values=value_counts.values, names=value_counts.index, title=title, color_discrete_sequence=colors_to_use)
-        
-        elif chart_type == 'area':
-            clean_df = df[[x_col, y_col]].replace([np.inf, -np.inf], np.nan).dropna()
-            fig = px.area(clean_df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use)
-            
-        elif chart_type == 'bubble':
-            if z_col:
-                clean_df = df[[x_col, y_col, z_col]].replace([np.inf, -np.inf], np.nan).dropna()
-                fig = px.scatter(clean_df, x=x_col, y=y_col, size=z_col, title=title, color_discrete_sequence=colors_to_use)
-            else:
-                fig = px.scatter(df, x=x_col, y=y_col, title=title)
-        
-        elif chart_type == 'density_contour':
-            clean_df = df[[x_col, y_col]].replace([np.inf, -np.inf], np.nan).dropna()
-            fig = px.density_contour(clean_df, x=x_col, y=y_col, title=title, color_discrete_sequence=colors_to_use)
-            fig.update_traces(contours_coloring="fill", contours_showlabels=True)
-            
-        elif chart_type == 'density_heatmap':
-            clean_df = df[[x_col, y_col]].replace([np.inf, -np.inf], np.nan).dropna()
-            fig = px.density_heatmap(clean_df, x=x_col, y=y_col, title=title, color_continuous_scale=color_scheme)
-        
-        elif chart_type == 'sunburst':
-            if y_col:
-                fig = px.sunburst(df[[x_col, y_col]].dropna(), path=[x_col, y_col], title=title, color_discrete_sequence=colors_to_use)
-            else:
-                value_counts = df[x_col].value_counts()
-                fig = px.sunburst(names=value_counts.index, values=value_counts.values, title=title)
-        
-        elif chart_type == 'treemap':
-            if y_col:
-                fig = px.treemap(df[[x_col, y_col]].dropna(), path=[x_col, y_col], title=title, color_discrete_sequence=colors_to_use)
-            else:
-                value_counts = df[x_col].value_counts()
-                fig = px.treemap(names=value_counts.index, values=value_counts.values, title=title)
-        
-        elif chart_type == 'funnel':
-            value_counts = df[x_col].value_counts().head(10)
-            fig = px.funnel(y=value_counts.index, x=value_counts.values, title=title, color_discrete_sequence=colors_to_use)
-        
-        elif chart_type == 'waterfall':
-            if y_col:
-                clean_df = df[[x_col, y_col]].replace([np.inf, -np.inf], np.nan).dropna().head(20)
-                fig = go.Figure(go.Waterfall(x=clean_df[x_col], y=clean_df[y_col], name=title))
-                fig.update_layout(title=title)
-            else:
-                fig = go.Figure()
-                fig.update_layout(title=f"{title} (requires x and y columns)")
-        
-        elif chart_type == 'parallel_coordinates':
-            numeric_df = df.select_dtypes(include=['number']).replace([np.inf, -np.inf], np.nan).dropna().head(100)
-            fig = px.parallel_coordinates(numeric_df, title=title, color_continuous_scale=color_scheme)
-        
-        elif chart_type == 'parallel_categories':
-            if len(categorical_cols) >= 2:
-                cat_df = df[categorical_cols[:4]].dropna().head(100)
-                fig = px.parallel_categories(cat_df, title=title, color_continuous_scale=color_scheme)
-        
-        elif chart_type == 'strip':
-            clean_df = df[[x_col, y_col if y_col else x_col]].replace([np.inf, -np.inf], np.nan).dropna()
-            fig = px.strip(clean_df, x=x_col, y=y_col if y_col else x_col, title=title, color_discrete_sequence=colors_to_use)
-        
-        elif chart_type == 'qqplot':
-            data = df[x_col].replace([np.inf, -np.inf], np.nan).dropna()
-            qq = stats.probplot(data, dist="norm")
-            fig = go.Figure()
-            fig.add_scatter(x=qq[0][0], y=qq[0][1], mode='markers', name='Data')
-            fig.add_scatter(x=qq[0][0], y=qq[0][0] * qq[1][0] + qq[1][1], mode='lines', name='Fit', line=dict(color='red'))
-            fig.update_layout(title=title, xaxis_title='Theoretical Quantiles', yaxis_title='Sample Quantiles')
-        
-        elif chart_type == 'ecdf':
-            data = df[x_col].replace([np.inf, -np.inf], np.nan).dropna()
-            data_sorted = np.sort(data)
-            ecdf = np.arange(1, len(data_sorted) + 1) / len(data_sorted)
-            fig = go.Figure(go.Scatter(x=data_sorted, y=ecdf, mode='lines'))
-            fig.update_layout(title=title, xaxis_title=x_col, yaxis_title='ECDF')
-        
-        elif chart_type == '3d_scatter':
-            if y_col and z_col:
-                clean_df = df[[x_col, y_col, z_col]].replace([np.inf, -np.inf], np.nan).dropna()
-                fig = px.scatter_3d(clean_df, x=x_col, y=y_col, z=z_col, title=title, color_discrete_sequence=colors_to_use)
-            else:
-                fig = go.Figure()
-                fig.update_layout(title=f"{title} (requires x, y, z columns)")
-        
-        else:
-            fig = px.histogram(df[df[x_col].notna()], x=x_col, title=f"{title} (fallback)")
+        handler = CHART_DISPATCH.get(chart_type, _chart_fallback)
+        fig = handler(
+            df=df,
+            plot_df=plot_df,
+            clean_frames=clean_frames,
+            x_col=x_col,
+            y_col=y_col,
+            z_col=z_col,
+            title=title,
+            color_scheme=color_scheme,
+            colors_to_use=colors_to_use,
+            categorical_cols=categorical_cols
+        )
         
         fig.update_layout(
             hovermode='closest',
@@ -477,6 +562,219 @@ def generate_plotly_chart(df, suggestion, categorical_cols=None):
         fig.update_layout(title=f"{title} (Error)", height=400)
         return fig
 
+def numeric_columns(df):
+    """Names of numeric (non-boolean) columns, read from the dtypes without copying any data"""
+    return [col for col, dtype in df.dtypes.items() if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+
+def correlation_matrix(df, columns=None):
+    """Pairwise Pearson correlation (same NaN handling as DataFrame.corr) computed with float32 matrix products"""
+    columns = list(df.columns) if columns is None else columns
+    
+    # Only the requested columns are copied, straight into one float32 matrix
+    values = np.empty((len(df), len(columns)), dtype=np.float32)
+    for j, col in enumerate(columns):
+        values[:, j] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+    
+    # Infinities count as missing; columns with no finite value are left out, as before
+    mask = np.isfinite(values)
+    present = mask.any(axis=0)
+    if not present.all():
+        values, mask = values[:, present], mask[:, present]
+        columns = [col for col, keep in zip(columns, present) if keep]
+    weights = mask.astype(np.float32)
+    
+    # Centering on column means first keeps float32 sums well conditioned
+    counts = weights.sum(axis=0)
+    means = np.divide(np.where(mask, values, 0).sum(axis=0), counts, out=np.zeros_like(counts), where=counts > 0)
+    centered = np.where(mask, values - means, 0).astype(np.float32)
+    
+    # Sums over the rows where both columns of each pair are present, one GEMM per term
+    n = weights.T @ weights
+    sum_x = centered.T @ weights
+    sum_xx = (centered * centered).T @ weights
+    sum_xy = centered.T @ centered
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x * sum_x / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    
+    corr[n < 2] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(np.diag(var_x) > 0, 1.0, np.nan))
+    
+    return pd.DataFrame(corr.astype(np.float64), index=columns, columns=columns)
+
+class CleanFrames:
+    """Per-dashboard memo of column subsets with infinities nulled and incomplete rows dropped"""
+    
+    def __init__(self, df):
+        self.df = df
+        oversized = len(df) > PLOT_ROW_CAP
+        # Aggregating charts (counts, correlations) still read the full frame
+        self.sample = df.sample(n=PLOT_ROW_CAP, random_state=0) if oversized else df
+        self.strided = df.iloc[::len(df) // PLOT_ROW_CAP + 1] if oversized else df
+        self._frames = {}
+        self._lock = threading.Lock()
+    
+    def _memo(self, key, build):
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is None:
+            frame = build()
+            with self._lock:
+                self._frames[key] = frame
+        return frame
+    
+    def get(self, *cols, rows='sample'):
+        """Cleaned cols from the random sample, the evenly strided rows, or 'all' rows; computed once each"""
+        source = {'sample': self.sample, 'stride': self.strided, 'all': self.df}[rows]
+        names = list(dict.fromkeys(cols))
+        return self._memo((rows, *names), lambda: source[names].replace([np.inf, -np.inf], np.nan).dropna())
+    
+    def numeric(self):
+        """All numeric columns with infinities replaced by NaN (rows are kept)"""
+        return self._memo(None, lambda: self.df.select_dtypes(include=['number']).replace([np.inf, -np.inf], np.nan))
+    
+    def categorical(self, col):
+        """col as category dtype when its values repeat enough for int codes to pay off; converted once"""
+        def build():
+            series = self.df[col]
+            if series.dtype != object:
+                return series
+            codes, uniques = pd.factorize(series)
+            if len(uniques) >= len(series) * 0.5:
+                return series
+            return pd.Series(pd.Categorical.from_codes(codes, uniques), index=series.index, name=col)
+        return self._memo(('category', col), build)
+    
+    def value_counts(self, col):
+        """Counts of col's values, most frequent first, shared by every counting chart"""
+        def build():
+            counts = self.categorical(col).value_counts()
+            counts = counts[counts > 0]
+            if isinstance(counts.index, pd.CategoricalIndex):
+                # Plot labels stay plain values rather than category objects
+                counts.index = counts.index.astype(object)
+            return counts
+        return self._memo(('counts', col), build)
+
+def generate_chart_json(df, suggestion, categorical_cols=None, clean_frames=None):
+    """Build a chart and serialize it to Plotly JSON (both steps are CPU-bound)"""
+    return generate_plotly_chart(df, suggestion, categorical_cols, clean_frames).to_json()
+
+def build_dashboard_item(df, suggestion, categorical_cols=None, dataset_version=None, clean_frames=None):
+    """Turn one LLM suggestion into a metric card or serialized chart; None if it cannot be built"""
+    try:
+        if suggestion.get('type') == 'metric_card':
+            metric = generate_metric_card(df, suggestion)
+            return ChartData(
+                type='metric_card',
+                title=suggestion['title'],
+                plotly_json=None,
+                description=suggestion.get('description', ''),
+                metric_card=metric
+            )
+        return ChartData(
+            type=suggestion['type'],
+            title=suggestion['title'],
+            plotly_json=cached_chart_json(df, suggestion, categorical_cols, dataset_version, clean_frames),
+            description=suggestion.get('description', ''),
+            color_scheme=suggestion.get('color_scheme', 'viridis'),
+            metric_card=None
+        )
+    except Exception as e:
+        print(f"Failed to generate item {suggestion.get('type', 'unknown')}: {e}")
+        return None
+
+class SuggestionStreamParser:
+    """Pull complete objects out of a streamed top-level JSON array in one linear pass"""
+    
+    def __init__(self):
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer = []
+    
+    def feed(self, text: str) -> List[Dict]:
+        """Consume the next fragment and return the suggestions it completed"""
+        completed = []
+        pos = 0
+        while pos < len(text) and not self._done:
+            if not self._in_array:
+                start = text.find('[', pos)
+                if start == -1:
+                    break
+                self._in_array = True
+                pos = start + 1
+                continue
+            
+            if self._depth == 0:
+                # Between elements: only an opening brace or the end of the array matters
+                brace = text.find('{', pos)
+                end = text.find(']', pos)
+                if end != -1 and (brace == -1 or end < brace):
+                    self._done = True
+                    break
+                if brace == -1:
+                    break
+                self._depth = 1
+                self._buffer = ['{']
+                pos = brace + 1
+                continue
+            
+            if self._escaped:
+                self._buffer.append(text[pos])
+                self._escaped = False
+                pos += 1
+                continue
+            
+            # Jump straight to the next character that can change string or nesting state
+            match = (_STRING_SPECIAL if self._in_string else _OBJECT_SPECIAL).search(text, pos)
+            if match is None:
+                self._buffer.append(text[pos:])
+                break
+            ch = match.group()
+            self._buffer.append(text[pos:match.end()])
+            pos = match.end()
+            
+            if self._in_string:
+                if ch == '\\':
+                    self._escaped = True
+                else:
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads(''.join(self._buffer)))
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed suggestion: {e}")
+        return completed
+
+def cached_chart_json(df, suggestion, categorical_cols=None, dataset_version=None, clean_frames=None):
+    """Return chart JSON from the cache when this spec was already rendered for the same dataset version"""
+    if dataset_version is None:
+        return generate_chart_json(df, suggestion, categorical_cols, clean_frames)
+    
+    spec = json.dumps(suggestion, sort_keys=True, default=str) + repr(dataset_version)
+    cache_key = hashlib.blake2b(spec.encode(), digest_size=16).hexdigest()
+    
+    with chart_json_cache_lock:
+        plotly_json = chart_json_cache.get(cache_key)
+    if plotly_json is None:
+        plotly_json = generate_chart_json(df, suggestion, categorical_cols, clean_frames)
+        with chart_json_cache_lock:
+            chart_json_cache[cache_key] = plotly_json
+    
+    return plotly_json
+
 def generate_fallback_suggestions(df, numeric_cols, categorical_cols, user_prompt):
     """Generate diverse fallback suggestions"""
     suggestions = []
@@ -1,54 +1,72 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-import pandas as pd
+from sqlalchemy import insert
+import asyncio
+import base64
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from app.core.database import get_db
 from app.core.config import settings
-from app.models.database_models import DatasetMetadata, AnomalyDetection
+from app.models.database_models import AnomalyDetection
 from app.models.schemas import AnomalyDetectionResult
 from app.services.ml_engine import AnomalyEnsemble
 from app.services.explainability import SHAPExplainer
+from app.services import anomaly_store, dataset_cache, lookups
+from app.utils.helpers import cpu_semaphore, run_blocking
 
 router = APIRouter()
 
+# Model fitting and SHAP are CPU-bound and hold the GIL in places, so they run in worker processes.
+# 'spawn' keeps workers independent of the server's threads on every platform.
+ml_executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+
+def _detect_and_explain(df):
+    """Fit the ensemble and explain its anomalies (runs inside a worker process)"""
+    ensemble = AnomalyEnsemble()
+    result = ensemble.detect_anomalies(df)
+    
+    explainer = SHAPExplainer()
+    explanations = explainer.explain_anomalies(
+        df,
+        ensemble.models['isolation_forest'].model,
+        result['ensemble_anomalies']
+    )
+    return result, explanations
+
 @router.post("/{dataset_id}", response_model=AnomalyDetectionResult)
 async def detect_anomalies(dataset_id: int, db: Session = Depends(get_db)):
-    dataset = db.query(DatasetMetadata).filter(DatasetMetadata.id == dataset_id).first()
+    dataset = lookups.get_dataset(db, dataset_id)
     
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     file_path = os.path.join(settings.UPLOAD_DIR, dataset.filename)
     
-    if dataset.filename.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    else:
-        df = pd.read_excel(file_path)
+    df = await run_blocking(dataset_cache.get_dataframe, dataset.id, file_path)
     
-    ensemble = AnomalyEnsemble()
-    result = ensemble.detect_anomalies(df)
+    async with cpu_semaphore:
+        loop = asyncio.get_running_loop()
+        result, explanations = await loop.run_in_executor(ml_executor, _detect_and_explain, df)
     
     anomaly_indices = result['ensemble_anomalies']
     anomaly_count = len(anomaly_indices)
     anomaly_percentage = (anomaly_count / len(df)) * 100 if len(df) > 0 else 0.0
     
-    explainer = SHAPExplainer()
-    explanations = explainer.explain_anomalies(
-        df,
-        ensemble.models['isolation_forest'].model,
-        anomaly_indices
-    )
+    # Scores are quantized to int8 and kept in a file; indices become a one-bit-per-row mask
+    quantized, scale = anomaly_store.quantize_scores(result['scores'])
+    scores_file = await run_blocking(anomaly_store.write_scores, dataset_id, quantized)
     
-    anomaly_record = AnomalyDetection(
+    db.execute(insert(AnomalyDetection).values(
         dataset_id=dataset_id,
         model_used='ensemble',
         anomaly_count=anomaly_count,
-        anomaly_indices=anomaly_indices,
-        anomaly_scores=result['scores'].tolist() if hasattr(result['scores'], 'tolist') else [],
+        indices_blob=anomaly_store.pack_mask(anomaly_indices, len(quantized)),
+        scores_path=scores_file,
+        score_count=len(quantized),
+        score_scale=scale,
         feature_contributions=explanations
-    )
-    
-    db.add(anomaly_record)
+    ))
     dataset.status = 'anomaly_detected'
     db.commit()
     
@@ -56,7 +74,9 @@ async def detect_anomalies(dataset_id: int, db: Session = Depends(get_db)):
         anomaly_count=anomaly_count,
         anomaly_percentage=round(anomaly_percentage, 2),
         anomaly_indices=anomaly_indices,
-        feature_importance=explanations.get('global_feature_importance', {})
+        feature_importance=explanations.get('global_feature_importance', {}),
+        scores_b64=base64.b64encode(quantized.tobytes()).decode('ascii'),
+        score_scale=scale
     )
 
 @router.get("/{dataset_id}/details")
@@ -70,7 +90,7 @@ async def get_anomaly_details(dataset_id: int, db: Session = Depends(get_db)):
     
     return {
         'anomaly_count': anomaly.anomaly_count,
-        'anomaly_indices': anomaly.anomaly_indices,
+        'anomaly_indices': anomaly_store.unpack_mask(anomaly.indices_blob, anomaly.score_count) if anomaly.indices_blob is not None else anomaly.anomaly_indices,
         'feature_contributions': anomaly.feature_contributions,
         'detection_timestamp': anomaly.detection_timestamp
     }
@@ -1,64 +1,171 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-import pandas as pd
 import os
 import asyncio
-import json
+import multiprocessing
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
 from app.core.database import get_db
 from app.core.config import settings
-from app.models.database_models import DatasetMetadata, QualityAssessment
+from app.models.database_models import QualityAssessment
 from app.models.schemas import QualityMetrics
+from app.services import dataset_cache, lookups
 from app.services.quality_engine import (
     CompletenessAnalyzer,
     ConsistencyAnalyzer,
     AccuracyAnalyzer,
-    UniquenessAnalyzer
+    UniquenessAnalyzer,
+    ColumnStats
 )
+from app.utils.helpers import cpu_semaphore, run_blocking, sse_event
 
 router = APIRouter()
 
+ANALYZERS = {
+    'completeness': CompletenessAnalyzer,
+    'consistency': ConsistencyAnalyzer,
+    'accuracy': AccuracyAnalyzer,
+    'uniqueness': UniquenessAnalyzer
+}
+
+# One worker per analyzer; 'spawn' keeps workers independent of the server's threads on every platform
+analyzer_executor = ProcessPoolExecutor(max_workers=len(ANALYZERS), mp_context=multiprocessing.get_context('spawn'))
+
+# Live assessment progress: each watcher of a dataset gets its own queue, and the latest
+# event is kept so a watcher that connects mid-assessment starts from the current step
+progress_subscribers: Dict[int, List[asyncio.Queue]] = {}
+progress_latest: Dict[int, dict] = {}
+
+# A progress stream closes after this many seconds without an event
+PROGRESS_IDLE_TIMEOUT = 60
+
+def publish_progress(dataset_id: int, step: str, progress: int):
+    """Send a progress event to everyone watching this dataset's assessment"""
+    event = {"step": step, "progress": progress}
+    progress_latest[dataset_id] = event
+    for queue in progress_subscribers.get(dataset_id, []):
+        queue.put_nowait(event)
+    _forget_finished(dataset_id)
+
+def _forget_finished(dataset_id: int):
+    # A finished assessment's last event is only kept while someone is still watching it
+    latest = progress_latest.get(dataset_id)
+    if latest and latest["progress"] >= 100 and not progress_subscribers.get(dataset_id):
+        del progress_latest[dataset_id]
+
 async def progress_generator(dataset_id: int):
-    """Generator for progress updates"""
-    steps = [
-        {"step": "Loading dataset", "progress": 10},
-        {"step": "Analyzing completeness", "progress": 30},
-        {"step": "Checking consistency", "progress": 50},
-        {"step": "Validating accuracy", "progress": 70},
-        {"step": "Computing uniqueness", "progress": 90},
-        {"step": "Finalizing report", "progress": 100}
-    ]
+    """Generator for progress updates published by the running assessment"""
+    queue = asyncio.Queue()
+    progress_subscribers.setdefault(dataset_id, []).append(queue)
     
-    for step_data in steps:
-        yield f"data: {json.dumps(step_data)}\n\n"
-        await asyncio.sleep(0.5)
+    try:
+        latest = progress_latest.get(dataset_id)
+        if latest and latest["progress"] < 100:
+            yield sse_event(latest)
+        
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=PROGRESS_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                break
+            yield sse_event(event)
+            if event["progress"] >= 100:
+                break
+    finally:
+        progress_subscribers[dataset_id].remove(queue)
+        if not progress_subscribers[dataset_id]:
+            del progress_subscribers[dataset_id]
+            _forget_finished(dataset_id)
 
 @router.get("/{dataset_id}/progress")
 async def get_assessment_progress(dataset_id: int):
     """Stream progress updates for assessment"""
     return StreamingResponse(
         progress_generator(dataset_id),
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
     )
 
+def _frame_payload(df):
+    """Serialize the dataset once as Arrow IPC bytes for the workers; frames Arrow cannot hold are pickled as is"""
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return df
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _run_analyzer(name, payload) -> dict:
+    """Run one quality analyzer over the dataset (runs inside a worker process)"""
+    if not isinstance(payload, bytes):
+        return ANALYZERS[name]().analyze(payload)
+    table = pa.ipc.open_stream(payload).read_all()
+    df = table.to_pandas()
+    if name in ('completeness', 'uniqueness'):
+        # Null and distinct counts are reduced by Arrow on the table the frame came from
+        return ANALYZERS[name]().analyze(df, ColumnStats(df, table))
+    return ANALYZERS[name]().analyze(df)
+
 @router.post("/{dataset_id}", response_model=QualityMetrics)
 async def assess_quality(dataset_id: int, db: Session = Depends(get_db)):
-    dataset = db.query(DatasetMetadata).filter(DatasetMetadata.id == dataset_id).first()
+    dataset = lookups.get_dataset(db, dataset_id)
     
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
     file_path = os.path.join(settings.UPLOAD_DIR, dataset.filename)
     
-    if dataset.filename.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    else:
-        df = pd.read_excel(file_path)
+    # An unchanged file is not parsed or analyzed again; its last assessment is returned as is
+    source_key = dataset_cache.source_key(file_path)
+    previous = db.query(QualityAssessment).filter(
+        QualityAssessment.dataset_id == dataset_id,
+        QualityAssessment.source_key == source_key
+    ).order_by(QualityAssessment.assessment_timestamp.desc()).first()
+    
+    if previous:
+        publish_progress(dataset_id, "Finalizing report", 100)
+        return QualityMetrics(
+            completeness_score=previous.completeness_score,
+            consistency_score=previous.consistency_score,
+            accuracy_score=previous.accuracy_score,
+            uniqueness_score=previous.uniqueness_score,
+            overall_score=previous.overall_score
+        )
+    
+    publish_progress(dataset_id, "Loading dataset", 10)
     
-    completeness = CompletenessAnalyzer().analyze(df)
-    consistency = ConsistencyAnalyzer().analyze(df)
-    accuracy = AccuracyAnalyzer().analyze(df)
-    uniqueness = UniquenessAnalyzer().analyze(df)
+    try:
+        # Parsed off the event loop by Arrow (or read from the parquet copy) and shared with the other routes
+        df = await run_blocking(dataset_cache.get_dataframe, dataset.id, file_path)
+        
+        # The four passes are independent, so each runs in its own process on the same serialized frame
+        payload = await run_blocking(_frame_payload, df)
+        loop = asyncio.get_running_loop()
+        finished = []
+        
+        async def analyze(name):
+            report = await loop.run_in_executor(analyzer_executor, _run_analyzer, name, payload)
+            finished.append(name)
+            publish_progress(dataset_id, f"{name.title()} analyzed", 10 + 20 * len(finished))
+            return report
+        
+        async with cpu_semaphore:
+            reports = await asyncio.gather(*[analyze(name) for name in ANALYZERS])
+    except Exception:
+        publish_progress(dataset_id, "Assessment failed", 100)
+        raise
+    results = dict(zip(ANALYZERS, reports))
+    completeness = results['completeness']
+    consistency = results['consistency']
+    accuracy = results['accuracy']
+    uniqueness = results['uniqueness']
     
     completeness_score = completeness['overall_completeness']
     consistency_score = 100 - (len(consistency['format_consistency']) * 10)
@@ -81,13 +188,15 @@ async def assess_quality(dataset_id: int, db: Session = Depends(get_db)):
         accuracy_score=max(0, accuracy_score),
         uniqueness_score=uniqueness_score,
         overall_score=overall_score,
-        quality_report=quality_report
+        quality_report=quality_report,
+        source_key=source_key
     )
     
     db.add(assessment)
     dataset.status = 'assessed'
     db.commit()
     db.refresh(assessment)
+    publish_progress(dataset_id, "Finalizing report", 100)
     
     return QualityMetrics(
         completeness_score=completeness_score,
@@ -99,11 +208,10 @@ async def assess_quality(dataset_id: int, db: Session = Depends(get_db)):
 
 @router.get("/{dataset_id}/report")
 async def get_quality_report(dataset_id: int, db: Session = Depends(get_db)):
-    assessment = db.query(QualityAssessment).filter(
-        QualityAssessment.dataset_id == dataset_id
-    ).order_by(QualityAssessment.assessment_timestamp.desc()).first()
+    assessment = lookups.latest_assessment(db, dataset_id)
     
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
     
-    return assessment.quality_report
+    # Stored as JSON, so orjson can write it as is without a jsonable_encoder pass
+    return ORJSONResponse(assessment.quality_report)
@@ -1,15 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
 from datetime import datetime
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.config import settings
 from app.models.database_models import ChatSession, ChatMessage
-from app.services.llm_engine.ollama_client import OllamaClient
+from app.services.llm_engine.ollama_client import OllamaStreamError, get_ollama_client
+from app.utils.helpers import sse_event
 import logging
 
 router = APIRouter()
-ollama_client = OllamaClient()
+ollama_client = get_ollama_client()
 logger = logging.getLogger(__name__)
 
 class ChatRequest(BaseModel):
@@ -23,53 +27,84 @@ class ChatResponse(BaseModel):
     assistant_message_id: int
     response: str
 
+DEFAULT_SYSTEM_PROMPT = """You are a helpful AI assistant specializing in data quality and data science. 
+Use markdown formatting. Answer based on the conversation history provided."""
+
+def build_conversation_context(previous_messages, message: str) -> str:
+    """Render this chat's (role, content) history plus the new message as the prompt sent to the model"""
+    lines = [
+        f"{'User' if role == 'user' else 'Assistant'}: {content}\n"
+        for role, content in previous_messages
+    ]
+    
+    # Add current message
+    lines.append(f"User: {message}\n")
+    return "".join(lines)
+
+async def get_or_start_session(db: AsyncSession, chat_session_id: Optional[int]):
+    """Look up a chat session by primary key, or start an unsaved one; returns it with its recent history"""
+    if not chat_session_id:
+        return ChatSession(name=f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}"), []
+    
+    chat_session = await db.get(ChatSession, chat_session_id)
+    if not chat_session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    
+    # Get ONLY the latest history for THIS chat session, as plain (role, content) rows; reading newest
+    # first walks the (chat_session_id, created_at) index backwards, then the rows are put back in order
+    previous_messages = (await db.execute(
+        select(ChatMessage.role, ChatMessage.content).where(
+            ChatMessage.chat_session_id == chat_session.id
+        ).order_by(ChatMessage.created_at.desc()).limit(settings.CHAT_HISTORY_LIMIT)
+    )).all()[::-1]
+    return chat_session, trim_history(previous_messages, settings.CHAT_HISTORY_MAX_CHARS)
+
+def trim_history(previous_messages, max_chars: int):
+    """Drop the oldest messages until the history fits the prompt's character budget"""
+    total = sum(len(content or "") for _, content in previous_messages)
+    start = 0
+    while start < len(previous_messages) and total > max_chars:
+        total -= len(previous_messages[start][1] or "")
+        start += 1
+    return previous_messages[start:]
+
+async def save_chat_turn(db: AsyncSession, chat_session: ChatSession, user_message: ChatMessage, assistant_message: ChatMessage):
+    """Persist a question, its reply and a new session in one transaction; returns their ids"""
+    if chat_session.id is None:
+        db.add(chat_session)
+        await db.flush()
+    
+    user_message.chat_session_id = chat_session.id
+    assistant_message.chat_session_id = chat_session.id
+    # Adding messages does not touch the session row, so its timestamp is bumped explicitly
+    chat_session.updated_at = datetime.utcnow()
+    db.add_all([user_message, assistant_message])
+    await db.flush()
+    
+    ids = (chat_session.id, user_message.id, assistant_message.id)
+    await db.commit()
+    return ids
+
 @router.post("/", response_model=ChatResponse)
-async def send_message(request: ChatRequest, db: Session = Depends(get_db)):
+async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
     """Send message to AI with conversation context (ONLY from active chat)"""
     
     try:
-        # Create or get chat session
-        if request.chat_session_id:
-            chat_session = db.query(ChatSession).filter(
-                ChatSession.id == request.chat_session_id
-            ).first()
-            if not chat_session:
-                raise HTTPException(status_code=404, detail="Chat session not found")
-        else:
-            chat_session = ChatSession(name=f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-            db.add(chat_session)
-            db.commit()
-            db.refresh(chat_session)
-        
-        # Get ONLY the conversation history for THIS chat session
-        previous_messages = db.query(ChatMessage).filter(
-            ChatMessage.chat_session_id == chat_session.id
-        ).order_by(ChatMessage.created_at.asc()).limit(20).all()  # Last 20 messages only
+        # Nothing is written until the reply arrives, so the turn costs a single commit
+        chat_session, previous_messages = await get_or_start_session(db, request.chat_session_id)
         
         # Build conversation context for the model
-        conversation_context = ""
-        for msg in previous_messages:
-            if msg.role == "user":
-                conversation_context += f"User: {msg.content}\n"
-            else:
-                conversation_context += f"Assistant: {msg.content}\n"
+        conversation_context = build_conversation_context(previous_messages, request.message)
         
-        # Add current message
-        conversation_context += f"User: {request.message}\n"
-        
-        # Save user message BEFORE sending to model
+        # Stamp the user message now so it sorts before the reply
         user_message = ChatMessage(
-            chat_session_id=chat_session.id,
             role="user",
-            content=request.message
+            content=request.message,
+            created_at=datetime.utcnow()
         )
-        db.add(user_message)
-        db.commit()
-        db.refresh(user_message)
         
         # Send ONLY this chat's conversation to the model
-        system_prompt = request.system_prompt or """You are a helpful AI assistant specializing in data quality and data science. 
-Use markdown formatting. Answer based on the conversation history provided."""
+        system_prompt = request.system_prompt or DEFAULT_SYSTEM_PROMPT
         
         logger.info(f"Sending conversation with {len(previous_messages)} previous messages to model")
         
@@ -80,134 +115,178 @@ Use markdown formatting. Answer based on the conversation history provided."""
             max_tokens=2000
         )
         
-        # Save assistant message
+        # Save both messages and the session timestamp together
         assistant_message = ChatMessage(
-            chat_session_id=chat_session.id,
             role="assistant",
             content=ai_response.get('response', '')
         )
-        db.add(assistant_message)
-        db.commit()
-        db.refresh(assistant_message)
-        
-        # Update chat session timestamp
-        chat_session.updated_at = datetime.utcnow()
-        db.commit()
+        chat_session_id, user_message_id, assistant_message_id = await save_chat_turn(db, chat_session, user_message, assistant_message)
         
         return ChatResponse(
-            chat_session_id=chat_session.id,
-            user_message_id=user_message.id,
-            assistant_message_id=assistant_message.id,
+            chat_session_id=chat_session_id,
+            user_message_id=user_message_id,
+            assistant_message_id=assistant_message_id,
             response=ai_response.get('response', '')
         )
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stream")
+async def stream_message(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    """Send message to AI and stream the reply as server-sent events while it is generated"""
+    
+    chat_session, previous_messages = await get_or_start_session(db, request.chat_session_id)
+    
+    conversation_context = build_conversation_context(previous_messages, request.message)
+    
+    user_message = ChatMessage(
+        role="user",
+        content=request.message,
+        created_at=datetime.utcnow()
+    )
+    
+    system_prompt = request.system_prompt or DEFAULT_SYSTEM_PROMPT
+    
+    async def event_generator():
+        tokens = []
+        try:
+            # Each token is forwarded as soon as Ollama decodes it
+            async for token in ollama_client.generate_stream(
+                prompt=conversation_context,
+                system_prompt=system_prompt,
+                temperature=0.7,
+                max_tokens=2000
+            ):
+                tokens.append(token)
+                yield sse_event({'type': 'chunk', 'content': token})
+            
+            if not tokens:
+                yield sse_event({'type': 'error', 'content': 'No response from the model. Ensure Ollama is running.'})
+                return
+            
+            assistant_message = ChatMessage(
+                role="assistant",
+                content="".join(tokens)
+            )
+            chat_session_id, user_message_id, assistant_message_id = await save_chat_turn(db, chat_session, user_message, assistant_message)
+            
+            yield sse_event({'type': 'done', 'chat_session_id': chat_session_id, 'user_message_id': user_message_id, 'assistant_message_id': assistant_message_id})
+        
+        except OllamaStreamError as e:
+            # A reply cut off partway is reported, not saved to the history as if it were complete
+            logger.error(f"Chat stream cut off after {len(tokens)} tokens: {str(e)}")
+            yield sse_event({'type': 'error', 'content': str(e)})
+        
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Chat stream error: {str(e)}")
+            yield sse_event({'type': 'error', 'content': str(e)})
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
 @router.post("/sessions/create")
-async def create_chat_session(db: Session = Depends(get_db)):
+async def create_chat_session(db: AsyncSession = Depends(get_async_db)):
     """Create a new empty chat session"""
     
     try:
         chat_session = ChatSession(name=f"New Chat")
         db.add(chat_session)
-        db.commit()
-        db.refresh(chat_session)
+        # The flush assigns the id and column defaults, so no refresh SELECT is needed after commit
+        await db.flush()
         
-        logger.info(f"Created new chat session: {chat_session.id}")
-        
-        return {
+        created = {
             "id": chat_session.id,
             "name": chat_session.name,
             "created_at": chat_session.created_at.isoformat(),
             "updated_at": chat_session.updated_at.isoformat()
         }
+        await db.commit()
+        
+        logger.info(f"Created new chat session: {created['id']}")
+        
+        return created
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to create chat session: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create chat session: {str(e)}")
 
 @router.get("/sessions")
-async def get_chat_sessions(db: Session = Depends(get_db)):
+async def get_chat_sessions(db: AsyncSession = Depends(get_async_db)):
     """Get all chat sessions"""
     
-    sessions = db.query(ChatSession).order_by(ChatSession.updated_at.desc()).all()
+    sessions = (await db.execute(
+        select(ChatSession.id, ChatSession.name, ChatSession.created_at, ChatSession.updated_at)
+        .order_by(ChatSession.updated_at.desc())
+    )).mappings().all()
     
-    return [
-        {
-            "id": session.id,
-            "name": session.name,
-            "created_at": session.created_at.isoformat(),
-            "updated_at": session.updated_at.isoformat()
-        }
-        for session in sessions
-    ]
+    # Plain rows go straight to orjson, which writes datetimes in isoformat, skipping jsonable_encoder
+    return ORJSONResponse([dict(session) for session in sessions])
 
 @router.get("/sessions/{session_id}/messages")
-async def get_chat_messages(session_id: int, db: Session = Depends(get_db)):
+async def get_chat_messages(session_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all messages for a chat session"""
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.chat_session_id == session_id
-    ).order_by(ChatMessage.created_at.asc()).all()
-    
-    return [
-        {
-            "id": msg.id,
-            "chat_session_id": msg.chat_session_id,
-            "role": msg.role,
-            "content": msg.content,
-            "created_at": msg.created_at.isoformat()
-        }
-        for msg in messages
-    ]
+    messages = (await db.execute(
+        select(ChatMessage.id, ChatMessage.chat_session_id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at)
+        .where(ChatMessage.chat_session_id == session_id)
+        .order_by(ChatMessage.created_at.asc())
+    )).mappings().all()
+    
+    return ORJSONResponse([dict(msg) for msg in messages])
 
 @router.delete("/sessions/{session_id}")
-async def delete_chat_session(session_id: int, db: Session = Depends(get_db)):
+async def delete_chat_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a chat session and all its messages"""
     
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Chat session not found")
-    
     try:
-        # Delete all messages first
-        messages_deleted = db.query(ChatMessage).filter(
-            ChatMessage.chat_session_id == session_id
-        ).delete()
-        
-        # Delete session
-        db.delete(session)
-        db.commit()
-        
-        logger.info(f"Deleted chat session {session_id} with {messages_deleted} messages")
-        
-        return {
-            "message": "Chat session deleted successfully",
-            "session_id": session_id,
-            "messages_deleted": messages_deleted
-        }
+        # The messages are deleted explicitly in the same transaction, since tables created before the
+        # foreign key had ON DELETE CASCADE would otherwise keep them
+        messages_deleted = (await db.execute(
+            delete(ChatMessage).where(ChatMessage.chat_session_id == session_id).execution_options(synchronize_session=False)
+        )).rowcount
+        sessions_deleted = (await db.execute(
+            delete(ChatSession).where(ChatSession.id == session_id).execution_options(synchronize_session=False)
+        )).rowcount
+        await db.commit()
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to delete chat session {session_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete chat session: {str(e)}")
+    
+    if not sessions_deleted:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    
+    logger.info(f"Deleted chat session {session_id} with {messages_deleted} messages")
+    
+    return {
+        "message": "Chat session deleted successfully",
+        "session_id": session_id,
+        "messages_deleted": messages_deleted
+    }
 
 @router.put("/sessions/{session_id}/rename")
-async def rename_chat_session(session_id: int, name: str, db: Session = Depends(get_db)):
+async def rename_chat_session(session_id: int, name: str, db: AsyncSession = Depends(get_async_db)):
     """Rename a chat session"""
     
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     
     try:
         session.name = name
-        session.updated_at = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         return {
             "message": "Chat session renamed successfully",
@@ -216,21 +295,21 @@ async def rename_chat_session(session_id: int, name: str, db: Session = Depends(
         }
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to rename chat session {session_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to rename chat session: {str(e)}")
 
 @router.delete("/messages/{message_id}")
-async def delete_message(message_id: int, db: Session = Depends(get_db)):
+async def delete_message(message_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a specific message"""
     
-    message = db.query(ChatMessage).filter(ChatMessage.id == message_id).first()
+    message = await db.get(ChatMessage, message_id)
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
     try:
-        db.delete(message)
-        db.commit()
+        await db.delete(message)
+        await db.commit()
         
         logger.info(f"Deleted message {message_id}")
         
@@ -240,6 +319,6 @@ async def delete_message(message_id: int, db: Session = Depends(get_db)):
         }
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to delete message {message_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to delete message: {str(e)}")
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict
-import json
 from app.services.llm_engine.model_manager import model_manager
+from app.utils.helpers import coalesce_sse
 
 router = APIRouter()
 
@@ -21,19 +21,20 @@ async def get_available_models():
         models = await model_manager.get_available_models()
         current = model_manager.get_current_model()
         
-        return ModelResponse(
-            models=models,
-            current_model=current
-        )
+        # ModelResponse stays as the documented schema; the plain dict is written by orjson without revalidation
+        return ORJSONResponse({
+            "models": models,
+            "current_model": current
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/current")
 async def get_current_model():
     """Get currently active model"""
-    return {
+    return ORJSONResponse({
         "model": model_manager.get_current_model()
-    }
+    })
 
 @router.post("/pull/{model_name}")
 async def pull_model(model_name: str):
@@ -42,16 +43,18 @@ async def pull_model(model_name: str):
     async def event_generator():
         try:
             async for event in model_manager.pull_model_stream(model_name):
-                yield f"data: {json.dumps(event)}\n\n"
+                yield event
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            yield {'type': 'error', 'content': str(e)}
     
+    # Progress lines arrive in bursts; each burst goes out as a single write
     return StreamingResponse(
-        event_generator(),
+        coalesce_sse(event_generator()),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
         }
     )
 
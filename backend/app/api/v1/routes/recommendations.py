@@ -1,49 +1,62 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import pandas as pd
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
 import os
 import json
+import asyncio
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.database_models import DatasetMetadata, QualityAssessment, CleaningRecommendation
 from app.models.schemas import CleaningRecommendationResponse
-from app.services.llm_engine.ollama_client import OllamaClient
-from app.services.llm_engine.rag_system import RAGSystem
+from app.services.llm_engine.ollama_client import get_strategy_batcher
+from app.services.llm_engine.rag_system import get_rag_system
+from app.services import dataset_cache
+from app.utils.helpers import run_blocking
 
 router = APIRouter()
+strategy_batcher = get_strategy_batcher()
+
+def _retrieve_knowledge(issue_query: str) -> list:
+    """Best practices most relevant to the detected issues"""
+    return get_rag_system().retrieve_relevant_knowledge(issue_query, n_results=3)
 
 @router.post("/{dataset_id}")
 async def generate_recommendations(dataset_id: int, db: Session = Depends(get_db)):
-    dataset = db.query(DatasetMetadata).filter(DatasetMetadata.id == dataset_id).first()
-    
-    if not dataset:
+    # The dataset's profile columns and its latest report in one round trip; other columns stay unloaded
+    latest_report = select(QualityAssessment.quality_report).where(
+        QualityAssessment.dataset_id == DatasetMetadata.id
+    ).order_by(QualityAssessment.assessment_timestamp.desc()).limit(1).scalar_subquery()
+    
+    row = db.query(DatasetMetadata, latest_report).options(load_only(
+        DatasetMetadata.filename,
+        DatasetMetadata.row_count,
+        DatasetMetadata.column_count,
+        DatasetMetadata.schema_info
+    )).filter(DatasetMetadata.id == dataset_id).first()
+    
+    if not row:
         raise HTTPException(status_code=404, detail="Dataset not found")
     
-    assessment = db.query(QualityAssessment).filter(
-        QualityAssessment.dataset_id == dataset_id
-    ).order_by(QualityAssessment.assessment_timestamp.desc()).first()
-    
-    if not assessment:
+    dataset, report = row
+    if report is None:
         raise HTTPException(status_code=404, detail="Quality assessment not found. Run assessment first.")
     
-    file_path = os.path.join(settings.UPLOAD_DIR, dataset.filename)
-    
-    if dataset.filename.endswith('.csv'):
-        df = pd.read_csv(file_path)
+    schema_info = dataset.schema_info or {}
+    if 'missing_summary' in schema_info:
+        # Profiled at upload time, so the dataset itself is not read again
+        data_profile = {
+            'row_count': dataset.row_count,
+            'column_count': dataset.column_count,
+            **schema_info
+        }
     else:
-        df = pd.read_excel(file_path)
-    
-    data_profile = {
-        'row_count': len(df),
-        'column_count': len(df.columns),
-        'columns': df.columns.tolist(),
-        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
-        'missing_summary': df.isnull().sum().to_dict(),
-        'numeric_summary': df.describe().to_dict() if not df.select_dtypes(include=['number']).empty else {}
-    }
+        # Datasets uploaded before the profile was stored: the prompt only reads the row and column
+        # counts, so the footer is enough and no column is described or scanned for nulls
+        file_path = os.path.join(settings.UPLOAD_DIR, dataset.filename)
+        data_profile = await run_blocking(dataset_cache.get_shape, dataset.id, file_path)
     
     quality_issues = []
-    report = assessment.quality_report
     
     if report.get('completeness'):
         for col, stats in report['completeness'].get('column_completeness', {}).items():
@@ -64,14 +77,15 @@ async def generate_recommendations(dataset_id: int, db: Session = Depends(get_db
                 'details': 'Format inconsistency detected'
             })
     
-    rag_system = RAGSystem()
+    # Retrieval and generation are independent, so the embedding work (off the event loop)
+    # overlaps the wait on Ollama; datasets submitted together share one generation
     issue_query = ' '.join([issue['type'] for issue in quality_issues[:3]])
-    relevant_knowledge = rag_system.retrieve_relevant_knowledge(issue_query, n_results=3)
-    
-    ollama_client = OllamaClient()
-    llm_response = await ollama_client.generate_cleaning_strategy(
-        data_profile=data_profile,
-        quality_issues=quality_issues
+    relevant_knowledge, llm_response = await asyncio.gather(
+        run_blocking(_retrieve_knowledge, issue_query),
+        strategy_batcher.submit(
+            data_profile=data_profile,
+            quality_issues=quality_issues
+        )
     )
     
     context = f"\n\nRelevant Best Practices:\n"
@@ -97,7 +111,8 @@ async def generate_recommendations(dataset_id: int, db: Session = Depends(get_db
     dataset.status = 'recommendations_generated'
     db.commit()
     
-    return llm_response
+    # Parsed from the model's JSON, so it is written by orjson directly rather than walked by jsonable_encoder
+    return ORJSONResponse(llm_response)
 
 @router.get("/{dataset_id}")
 async def get_recommendations(dataset_id: int, db: Session = Depends(get_db)):
@@ -108,4 +123,4 @@ async def get_recommendations(dataset_id: int, db: Session = Depends(get_db)):
     if not recommendation:
         raise HTTPException(status_code=404, detail="Recommendations not found")
     
-    return recommendation.strategies
+    return ORJSONResponse(recommendation.strategies)
@@ -1,16 +1,43 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from sqlalchemy.orm import Session
-import pandas as pd
 import os
-import shutil
+import uuid
+import asyncio
+import aiofiles
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.database_models import DatasetMetadata
 from app.models.schemas import DatasetUploadResponse
+from app.services import dataset_cache
+from app.utils.helpers import cpu_semaphore
 
 router = APIRouter()
 
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Leading bytes every file of a binary format starts with: zip containers for xlsx, OLE2 for xls
+FILE_SIGNATURES = {
+    '.xlsx': b'PK\x03\x04',
+    '.xls': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+}
+# This much of a CSV is checked to be text before it is accepted
+SIGNATURE_PEEK_SIZE = 1024
+
+def _has_valid_signature(extension: str, head: bytes) -> bool:
+    """Whether the first bytes of an upload match what its extension claims"""
+    if extension in FILE_SIGNATURES:
+        return head.startswith(FILE_SIGNATURES[extension])
+    # Text never contains NUL bytes; binary data passed off as CSV almost always does
+    return b'\x00' not in head
+
+# Parsing and profiling hold the GIL in the pandas and calamine paths, so they run in worker processes
+# that hand back only the summary. 'spawn' keeps workers independent of the server's threads on every platform.
+ingest_executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+
 @router.post("/", response_model=DatasetUploadResponse)
 async def upload_dataset(
     file: UploadFile = File(...),
@@ -19,58 +46,90 @@ async def upload_dataset(
     """Upload a dataset for quality assessment"""
     
     # Validate file type
-    if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
+    extension = os.path.splitext(file.filename)[1]
+    if extension not in ('.csv', '.xlsx', '.xls'):
         raise HTTPException(status_code=400, detail="Only CSV and Excel files are supported")
     
+    # Rejected before a byte is written: the size recorded while the form was parsed, then the leading bytes
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds the upload limit of {settings.MAX_UPLOAD_SIZE} bytes")
+    
+    head = await file.read(SIGNATURE_PEEK_SIZE)
+    if not _has_valid_signature(extension, head):
+        raise HTTPException(status_code=400, detail=f"File content does not match its {extension} extension")
+    await file.seek(0)
+    
     # Ensure upload directory exists
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     
-    # Save file
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
+    # Save file under a random prefix, so uploads of the same name in the same second never collide
+    original_filename = os.path.basename(file.filename)
+    filename = f"{uuid.uuid4().hex}_{original_filename}"
     file_path = os.path.join(settings.UPLOAD_DIR, filename)
     
+    # Streamed in chunks so the event loop keeps serving other requests, counting bytes as they arrive
+    file_size = 0
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > settings.MAX_UPLOAD_SIZE:
+                    break
+                await buffer.write(chunk)
     except Exception as e:
+        if os.path.exists(file_path):
+            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
-    # Load and analyze file
+    if file_size > settings.MAX_UPLOAD_SIZE:
+        os.remove(file_path)
+        raise HTTPException(status_code=413, detail=f"File exceeds the upload limit of {settings.MAX_UPLOAD_SIZE} bytes")
+    
+    # CSVs are streamed into the columnar copy, so later endpoints skip re-parsing the text file
+    # and the profile they need is taken without holding the whole file in memory. The copy is
+    # written under a random name first: the dataset id that names it only exists once the row is
+    # inserted, and no write transaction is held open on the database while the file is parsed.
+    staging_path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}.parquet.tmp")
+    metadata = None
     try:
-        if filename.endswith('.csv'):
-            df = pd.read_csv(file_path, encoding='utf-8', on_bad_lines='skip')
-        else:
-            df = pd.read_excel(file_path)
+        async with cpu_semaphore:
+            loop = asyncio.get_running_loop()
+            summary = await loop.run_in_executor(ingest_executor, dataset_cache.ingest, staging_path, file_path)
         
-        # Create metadata
         metadata = DatasetMetadata(
             filename=filename,
             upload_timestamp=datetime.utcnow(),
-            row_count=len(df),
-            column_count=len(df.columns),
-            file_size_bytes=os.path.getsize(file_path),
+            file_size_bytes=file_size,
+            status="uploaded",
+            row_count=summary["row_count"],
+            column_count=summary["column_count"],
             schema_info={
-                "columns": df.columns.tolist(),
-                "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()}
-            },
-            status="uploaded"
+                "columns": summary["columns"],
+                "dtypes": summary["dtypes"],
+                "missing_summary": summary["missing_summary"],
+                "numeric_summary": summary["numeric_summary"]
+            }
         )
-        
         db.add(metadata)
+        db.flush()
+        # Moved into place inside the transaction, so a failed commit removes it again below
+        if os.path.exists(staging_path):
+            os.replace(staging_path, dataset_cache.parquet_path(metadata.id))
         db.commit()
-        db.refresh(metadata)
         
         return DatasetUploadResponse(
             dataset_id=metadata.id,
-            filename=metadata.filename,
+            filename=original_filename,
             row_count=metadata.row_count,
             column_count=metadata.column_count,
             status=metadata.status
         )
     
     except Exception as e:
-        # Clean up the uploaded file if processing fails
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Clean up the uploaded file and any columnar copy if processing fails
+        leftovers = [file_path, staging_path] + ([dataset_cache.parquet_path(metadata.id)] if metadata is not None and metadata.id else [])
+        db.rollback()
+        for path in leftovers:
+            if os.path.exists(path):
+                os.remove(path)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
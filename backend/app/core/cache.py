@@ -0,0 +1,35 @@
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+# Results of lookups made while serving the current request; None outside a request
+request_cache: ContextVar[Optional[Dict]] = ContextVar("request_cache", default=None)
+
+def memoize_request(func: Callable) -> Callable:
+    """Reuse a lookup's result for the rest of the request, keyed on the arguments after the session"""
+    @wraps(func)
+    def wrapper(db, *args: Any) -> Any:
+        cache = request_cache.get()
+        if cache is None:
+            return func(db, *args)
+        key = (func.__qualname__, *args)
+        if key not in cache:
+            cache[key] = func(db, *args)
+        return cache[key]
+    return wrapper
+
+class RequestCacheMiddleware:
+    """Give every HTTP request an empty lookup cache that is dropped when the request ends"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_cache.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_cache.reset(token)
@@ -26,6 +26,23 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "gemma2:2b"
     OLLAMA_TIMEOUT: int = 1000  # in seconds
+    OLLAMA_MAX_CONCURRENCY: int = 2  # generations in flight at once; more only queue inside Ollama
+    OLLAMA_KEEP_ALIVE: str = "5m"  # idle time before Ollama unloads the model and frees its memory
+    OLLAMA_RETRY_ATTEMPTS: int = 3  # tries per generation when the connection drops before any token arrives
+    OLLAMA_RETRY_MAX_WAIT: float = 8.0  # cap on the exponential backoff between tries, in seconds
+    OLLAMA_NUM_CTX: int = 4096  # the same on every request, since a different value makes Ollama reload the model
+    LLM_BATCH_WINDOW_MS: int = 50  # cleaning-strategy requests arriving within this window share one generation
+    LLM_BATCH_MAX_SIZE: int = 3  # datasets per shared generation, so prompts and answers fit in OLLAMA_NUM_CTX
+    STRATEGY_CACHE_SIZE: int = 256
+    STRATEGY_CACHE_TTL: int = 3600  # in seconds
+    
+    # Chat
+    CHAT_HISTORY_LIMIT: int = 40  # most recent messages loaded per turn
+    CHAT_HISTORY_MAX_CHARS: int = 8000  # about 2k tokens at ~4 characters per token
+    
+    # Dashboard
+    CHART_CACHE_SIZE: int = 256
+    CHART_CACHE_TTL: int = 3600  # in seconds
     
     # Cleanup
     CLEANUP_DAYS: int = 1
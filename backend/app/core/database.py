@@ -1,20 +1,91 @@
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    # Room for every distinct select() the routes issue, so none is compiled twice
+    query_cache_size=1200
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async driver for each sync URL scheme the app is configured with
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg"
+}
+
+def _async_url(url: str) -> str:
+    """The same database addressed through its asyncio driver"""
+    scheme, sep, rest = url.partition(":")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+# Request handlers that await the database use this engine; background jobs keep the sync one above
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL),
+    query_cache_size=1200,
+    **({} if "sqlite" in settings.DATABASE_URL else {"pool_size": 20})
+)
+
+# Objects stay loaded after commit, since touching an expired attribute would need implicit async IO
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # SQLite leaves foreign keys (and so ON DELETE CASCADE) off unless each connection asks for them
+    cursor.execute("PRAGMA foreign_keys=ON")
+    # WAL lets the API's reads run while the cleanup job or an upload writes; NORMAL syncs only at checkpoints,
+    # which is still safe against corruption in WAL mode
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # 32 MiB page cache per connection, temporary tables in memory, and reads through a 256 MiB memory map
+    cursor.execute("PRAGMA cache_size=-32768")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+if "sqlite" in settings.DATABASE_URL:
+    event.listen(engine, "connect", _configure_sqlite_connection)
+    event.listen(async_engine.sync_engine, "connect", _configure_sqlite_connection)
+
 Base = declarative_base()
 
+def add_missing_columns(columns):
+    """Add model columns that tables created before them lack; create_all never alters an existing table"""
+    existing = {}
+    inspector = inspect(engine)
+    for column in columns:
+        table = column.table.name
+        if table not in existing:
+            existing[table] = {info["name"] for info in inspector.get_columns(table)}
+        if column.name in existing[table]:
+            continue
+        column_type = column.type.compile(dialect=engine.dialect)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column.name} {column_type}'))
+            logger.info(f"Added column {table}.{column.name}")
+        except DBAPIError:
+            # Another worker starting at the same time may have added it first
+            if column.name not in {info["name"] for info in inspect(engine).get_columns(table)}:
+                raise
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,16 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+import asyncio
 import logging
 
+from app.core.cache import RequestCacheMiddleware
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.api.v1.routes import upload, assessment, anomaly, recommendations, auth, chat, ai_dashboard
-from app.services.cleanup_service import CleanupService
-from app.api.v1.routes import upload, assessment, anomaly, recommendations, auth, chat, ai_dashboard, admin
+from app.core.database import async_engine, engine, Base, add_missing_columns
+from app.models.database_models import ADDED_COLUMNS
 from app.api.v1.routes import upload, assessment, anomaly, recommendations, auth, chat, ai_dashboard, admin, models
+from app.services.cleanup_service import CleanupService
+from app.services.llm_engine.ollama_client import close_http_client, get_http_client
+from app.services.llm_engine.rag_system import get_rag_system
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +26,14 @@ logger = logging.getLogger(__name__)
 # Initialize scheduler
 scheduler = AsyncIOScheduler()
 
+def warm_rag_system():
+    """Load the knowledge base and its embedding model ahead of the first recommendation request"""
+    try:
+        get_rag_system()
+        logger.info("RAG system loaded")
+    except Exception as e:
+        logger.warning(f"Could not load the RAG system, it will be retried on first use: {e}")
+
 def scheduled_cleanup():
     """Run scheduled cleanup task"""
     logger.info("Running scheduled cleanup...")
@@ -37,8 +49,18 @@ async def lifespan(app: FastAPI):
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    # create_all leaves tables that already exist alone, so add the columns and indexes they are missing
+    add_missing_columns(ADDED_COLUMNS)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     logger.info("Database tables created")
     
+    # Build the shared Ollama connection pool up front instead of on the first request
+    get_http_client()
+    # The embedding model loads in the background so startup does not wait on it
+    asyncio.get_running_loop().run_in_executor(None, warm_rag_system)
+    
     # Start scheduler for automatic cleanup
     # Run every day at 2 AM
     scheduler.add_job(
@@ -67,11 +89,15 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down application...")
     scheduler.shutdown()
     logger.info("Cleanup scheduler stopped")
+    await close_http_client()
+    logger.info("Ollama connection pool closed")
+    await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -84,28 +110,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
-app.include_router(upload.router, prefix=f"{settings.API_V1_STR}/upload", tags=["upload"])
-app.include_router(assessment.router, prefix=f"{settings.API_V1_STR}/assessment", tags=["assessment"])
-app.include_router(anomaly.router, prefix=f"{settings.API_V1_STR}/anomaly", tags=["anomaly"])
-app.include_router(recommendations.router, prefix=f"{settings.API_V1_STR}/recommendations", tags=["recommendations"])
-app.include_router(chat.router, prefix=f"{settings.API_V1_STR}/chat", tags=["chat"])
-app.include_router(ai_dashboard.router, prefix=f"{settings.API_V1_STR}/ai-dashboard", tags=["ai-dashboard"])
-app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
-app.include_router(models.router, prefix=f"{settings.API_V1_STR}/models", tags=["models"])
+# Lookups memoized with memoize_request last for a single request
+app.add_middleware(RequestCacheMiddleware)
+
+# Include routers, each under its own path segment and tag
+ROUTERS = [
+    (auth, "auth"),
+    (upload, "upload"),
+    (assessment, "assessment"),
+    (anomaly, "anomaly"),
+    (recommendations, "recommendations"),
+    (chat, "chat"),
+    (ai_dashboard, "ai-dashboard"),
+    (admin, "admin"),
+    (models, "models"),
+]
+for module, name in ROUTERS:
+    app.include_router(module.router, prefix=f"{settings.API_V1_STR}/{name}", tags=[name])
 
 @app.get("/")
-def read_root():
-    return {
+async def read_root():
+    return ORJSONResponse({
         "message": "AI Data Quality Guardian API",
         "version": "1.0.0",
         "status": "online"
-    }
+    })
 
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+async def health_check():
+    return ORJSONResponse({"status": "healthy"})
 
 # Manual cleanup endpoint (admin use)
 @app.post(f"{settings.API_V1_STR}/admin/cleanup")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Float, Text, Boolean
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Float, Text, Boolean, LargeBinary, Index, ForeignKey
+from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
 
@@ -18,7 +19,7 @@ class DatasetMetadata(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
-    upload_timestamp = Column(DateTime, default=datetime.utcnow)
+    upload_timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     row_count = Column(Integer)
     column_count = Column(Integer)
     file_size_bytes = Column(Integer)
@@ -29,7 +30,7 @@ class QualityAssessment(Base):
     __tablename__ = "quality_assessments"
     
     id = Column(Integer, primary_key=True)
-    dataset_id = Column(Integer, index=True)
+    dataset_id = Column(Integer)
     assessment_timestamp = Column(DateTime, default=datetime.utcnow)
     completeness_score = Column(Float)
     consistency_score = Column(Float)
@@ -37,28 +38,40 @@ class QualityAssessment(Base):
     uniqueness_score = Column(Float)
     overall_score = Column(Float)
     quality_report = Column(JSON)
+    source_key = Column(String)  # dataset_cache.source_key of the file that was assessed
+    
+    # Latest assessment per dataset is one seek from the end of the dataset's range of this index
+    __table_args__ = (Index("ix_qa_ds_ts", "dataset_id", "assessment_timestamp"),)
 
 class AnomalyDetection(Base):
     __tablename__ = "anomaly_detections"
     
     id = Column(Integer, primary_key=True)
-    dataset_id = Column(Integer, index=True)
+    dataset_id = Column(Integer)
     detection_timestamp = Column(DateTime, default=datetime.utcnow)
     model_used = Column(String)
     anomaly_count = Column(Integer)
-    anomaly_indices = Column(JSON)
-    anomaly_scores = Column(JSON)
+    anomaly_indices = Column(JSON)  # Legacy rows only; new rows use indices_blob
+    anomaly_scores = Column(JSON)  # Legacy rows only; new rows use scores_path
+    indices_blob = Column(LargeBinary)  # np.packbits row mask, one bit per row
+    scores_path = Column(String)  # int8 score file under UPLOAD_DIR
+    score_count = Column(Integer)
+    score_scale = Column(Float)  # score = int8 value * score_scale
     feature_contributions = Column(JSON)
+    
+    __table_args__ = (Index("ix_ad_ds_ts", "dataset_id", "detection_timestamp"),)
 
 class CleaningRecommendation(Base):
     __tablename__ = "cleaning_recommendations"
     
     id = Column(Integer, primary_key=True)
-    dataset_id = Column(Integer, index=True)
+    dataset_id = Column(Integer)
     recommendation_timestamp = Column(DateTime, default=datetime.utcnow)
     strategies = Column(JSON)
     impact_analysis = Column(JSON)
     llm_reasoning = Column(Text)
+    
+    __table_args__ = (Index("ix_cr_ds_ts", "dataset_id", "recommendation_timestamp"),)
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
@@ -67,13 +80,29 @@ class ChatSession(Base):
     user_id = Column(Integer, index=True)  # Can link to User if needed
     name = Column(String, default="New Chat")
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set from the same UTC clock as created_at on insert and on every UPDATE; the database's now() is
+    # local time on PostgreSQL, so mixing the two would misorder sessions
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # The database removes a session's messages itself; passive_deletes keeps the ORM from loading them first
+    messages = relationship("ChatMessage", cascade="all, delete-orphan", passive_deletes=True)
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
     
     id = Column(Integer, primary_key=True, index=True)
-    chat_session_id = Column(Integer, index=True)
+    chat_session_id = Column(Integer, ForeignKey("chat_sessions.id", ondelete="CASCADE"), index=True)
     role = Column(String)  # 'user' or 'assistant'
     content = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # History is always read per session in creation order, straight off this index
+    __table_args__ = (Index("ix_chatmsg_sess_created", "chat_session_id", "created_at"),)
+
+# Columns added after their table first shipped; startup adds them to databases created before
+ADDED_COLUMNS = [
+    QualityAssessment.__table__.c.source_key,
+    AnomalyDetection.__table__.c.indices_blob,
+    AnomalyDetection.__table__.c.scores_path,
+    AnomalyDetection.__table__.c.score_count,
+    AnomalyDetection.__table__.c.score_scale,
+]
@@ -47,6 +47,8 @@ class AnomalyDetectionResult(BaseModel):
     anomaly_percentage: float
     anomaly_indices: List[int]
     feature_importance: Dict[str, Any]
+    scores_b64: Optional[str] = None  # base64 int8 per-row scores; multiply by score_scale
+    score_scale: Optional[float] = None
 
 class CleaningStrategy(BaseModel):
     issue_type: str
@@ -0,0 +1,52 @@
+import glob
+import os
+import uuid
+import numpy as np
+from typing import List, Tuple
+from app.core.config import settings
+
+SCORES_DIR = "anomaly_scores"
+
+def scores_dir() -> str:
+    """Directory under UPLOAD_DIR that holds the score files"""
+    return os.path.join(settings.UPLOAD_DIR, SCORES_DIR)
+
+def scores_path(dataset_id: int) -> str:
+    """Path for a new int8 score file of a dataset; every detection run gets its own"""
+    return os.path.join(scores_dir(), f"{dataset_id}_{uuid.uuid4().hex}.i8")
+
+def dataset_score_files(dataset_id: int) -> List[str]:
+    """Score files written by every detection run of a dataset, including the single file older runs shared"""
+    legacy = os.path.join(scores_dir(), f"{dataset_id}.i8")
+    return glob.glob(os.path.join(scores_dir(), f"{dataset_id}_*.i8")) + ([legacy] if os.path.exists(legacy) else [])
+
+def quantize_scores(scores) -> Tuple[np.ndarray, float]:
+    """Map scores onto int8 with a single scale factor, so that score ~= q * scale"""
+    scores = np.asarray(scores, dtype=np.float32)
+    peak = float(np.abs(scores).max()) if scores.size else 0.0
+    scale = peak / 127 if peak > 0 else 1.0
+    return np.clip(np.rint(scores / scale), -127, 127).astype(np.int8), scale
+
+def write_scores(dataset_id: int, quantized: np.ndarray) -> str:
+    """Write quantized per-row scores and return the file path"""
+    path = scores_path(dataset_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written beside its final name and moved into place, so a row never points at a partly written file
+    temp_path = f"{path}.tmp"
+    quantized.astype(np.int8, copy=False).tofile(temp_path)
+    os.replace(temp_path, path)
+    return path
+
+def read_scores(path: str, scale: float) -> np.ndarray:
+    """Load a score file written by write_scores back into float32 scores"""
+    return np.fromfile(path, dtype=np.int8).astype(np.float32) * scale
+
+def pack_mask(indices, row_count: int) -> bytes:
+    """Encode anomaly row indices as a bitmask with one bit per dataset row"""
+    mask = np.zeros(row_count, dtype=bool)
+    mask[np.asarray(indices, dtype=np.int64)] = True
+    return np.packbits(mask).tobytes()
+
+def unpack_mask(blob: bytes, row_count: int) -> List[int]:
+    """Inverse of pack_mask"""
+    return np.flatnonzero(np.unpackbits(np.frombuffer(blob, dtype=np.uint8), count=row_count)).tolist()
@@ -2,14 +2,60 @@ import os
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import delete, exists
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.database_models import DatasetMetadata, ChatSession, ChatMessage
+from app.models.database_models import DatasetMetadata, AnomalyDetection, ChatSession, ChatMessage
+from app.services.dataset_cache import parquet_path
+from app.services.anomaly_store import dataset_score_files, scores_dir
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Threads used to unlink the files of expired datasets
+FILE_REMOVAL_WORKERS = 8
+
+# Files younger than this are never treated as orphans: an upload, its staging copy or a score file
+# can be on disk for a while before the row that claims it is committed
+ORPHAN_MIN_AGE_SECONDS = 10 * 60
+
+def _sweep_orphans(directory: Path, known_names: set, stats: dict):
+    """Delete the settled files in directory that no database row refers to"""
+    if not directory.exists():
+        return
+    cutoff = time.time() - ORPHAN_MIN_AGE_SECONDS
+    for file_path in directory.iterdir():
+        if not file_path.is_file() or file_path.name in known_names or file_path.name == '.gitkeep':
+            continue
+        try:
+            # Temp files belong to a write still in progress, which moves them into place itself
+            if file_path.suffix == '.tmp' or file_path.stat().st_mtime > cutoff:
+                continue
+            file_path.unlink()
+            stats['orphaned_files_deleted'] += 1
+            logger.info(f"Deleted orphaned file: {file_path.name}")
+        except FileNotFoundError:
+            # Moved into place or removed by its owner since the listing
+            continue
+        except Exception as e:
+            error_msg = f"Error deleting orphaned file {file_path.name}: {str(e)}"
+            stats['errors'].append(error_msg)
+            logger.error(error_msg)
+
+def _remove_dataset_files(dataset_id: int, filename: str) -> bool:
+    """Remove a dataset's upload and derived files; True when the upload itself was there"""
+    for derived_path in (parquet_path(dataset_id), *dataset_score_files(dataset_id)):
+        if os.path.exists(derived_path):
+            os.remove(derived_path)
+    
+    file_path = os.path.join(settings.UPLOAD_DIR, filename)
+    if not os.path.exists(file_path):
+        return False
+    os.remove(file_path)
+    return True
+
 class CleanupService:
     """Service for cleaning up old files and database records"""
     
@@ -35,31 +81,29 @@ class CleanupService:
             cutoff_date = datetime.utcnow() - timedelta(days=days_old)
             
             # Find old datasets in database
-            old_datasets = db.query(DatasetMetadata).filter(
-                DatasetMetadata.upload_timestamp < cutoff_date
-            ).all()
+            is_old = DatasetMetadata.upload_timestamp < cutoff_date
+            old_datasets = db.query(DatasetMetadata.id, DatasetMetadata.filename).filter(is_old).all()
             
             logger.info(f"Found {len(old_datasets)} datasets older than {days_old} day(s)")
             
-            for dataset in old_datasets:
+            # Delete database records in one statement, before their files, so no record points at a removed file
+            stats['db_records_deleted'] = db.query(DatasetMetadata).filter(is_old).delete(synchronize_session=False)
+            db.commit()
+            
+            # Each dataset's files are unlinked independently, so they are removed side by side
+            with ThreadPoolExecutor(max_workers=FILE_REMOVAL_WORKERS) as pool:
+                removals = {pool.submit(_remove_dataset_files, dataset.id, dataset.filename): dataset for dataset in old_datasets}
+            
+            for future, dataset in removals.items():
                 try:
-                    # Delete physical file
-                    file_path = os.path.join(settings.UPLOAD_DIR, dataset.filename)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                    if future.result():
                         stats['files_deleted'] += 1
                         logger.info(f"Deleted file: {dataset.filename}")
-                    
-                    # Delete database record
-                    db.delete(dataset)
-                    stats['db_records_deleted'] += 1
-                    
                 except Exception as e:
                     error_msg = f"Error deleting dataset {dataset.id}: {str(e)}"
                     stats['errors'].append(error_msg)
                     logger.error(error_msg)
             
-            db.commit()
             logger.info(f"Cleanup completed: {stats}")
             
         except Exception as e:
@@ -76,7 +120,7 @@ class CleanupService:
     @staticmethod
     def cleanup_orphaned_files() -> dict:
         """
-        Delete files in upload directory that have no database record
+        Delete files in the upload and score directories that have no database record
         
         Returns:
             dict with cleanup statistics
@@ -88,22 +132,19 @@ class CleanupService:
         }
         
         try:
-            # Get all filenames from database
-            db_filenames = {dataset.filename for dataset in db.query(DatasetMetadata).all()}
+            # Get all filenames from database, including each dataset's parquet copy
+            db_filenames = set()
+            for dataset_id, filename in db.query(DatasetMetadata.id, DatasetMetadata.filename).all():
+                db_filenames.add(filename)
+                db_filenames.add(os.path.basename(parquet_path(dataset_id)))
+            _sweep_orphans(Path(settings.UPLOAD_DIR), db_filenames, stats)
             
-            # Get all files in upload directory
-            upload_dir = Path(settings.UPLOAD_DIR)
-            if upload_dir.exists():
-                for file_path in upload_dir.iterdir():
-                    if file_path.is_file() and file_path.name not in db_filenames and file_path.name != '.gitkeep':
-                        try:
-                            file_path.unlink()
-                            stats['orphaned_files_deleted'] += 1
-                            logger.info(f"Deleted orphaned file: {file_path.name}")
-                        except Exception as e:
-                            error_msg = f"Error deleting orphaned file {file_path.name}: {str(e)}"
-                            stats['errors'].append(error_msg)
-                            logger.error(error_msg)
+            # Score files left by detection runs whose rows are gone
+            score_filenames = {
+                os.path.basename(path)
+                for path, in db.query(AnomalyDetection.scores_path).filter(AnomalyDetection.scores_path.isnot(None))
+            }
+            _sweep_orphans(Path(scores_dir()), score_filenames, stats)
             
             logger.info(f"Orphaned files cleanup completed: {stats}")
             
@@ -137,26 +178,14 @@ class CleanupService:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days_old)
             
-            # Find chat sessions with no messages and older than cutoff
-            empty_chats = db.query(ChatSession).filter(
-                ChatSession.created_at < cutoff_date
-            ).all()
-            
-            for chat in empty_chats:
-                # Check if chat has no messages
-                message_count = db.query(ChatMessage).filter(
-                    ChatMessage.chat_session_id == chat.id
-                ).count()
-                
-                if message_count == 0:
-                    try:
-                        db.delete(chat)
-                        stats['empty_chats_deleted'] += 1
-                        logger.info(f"Deleted empty chat: {chat.id}")
-                    except Exception as e:
-                        error_msg = f"Error deleting empty chat {chat.id}: {str(e)}"
-                        stats['errors'].append(error_msg)
-                        logger.error(error_msg)
+            # One DELETE for every old session without a message; NOT EXISTS is answered from the message index
+            has_messages = exists().where(ChatMessage.chat_session_id == ChatSession.id)
+            result = db.execute(
+                delete(ChatSession)
+                .where(ChatSession.created_at < cutoff_date, ~has_messages)
+                .execution_options(synchronize_session=False)
+            )
+            stats['empty_chats_deleted'] = result.rowcount
             
             db.commit()
             logger.info(f"Empty chats cleanup completed: {stats}")
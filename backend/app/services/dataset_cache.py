@@ -0,0 +1,271 @@
+import os
+import math
+import hashlib
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def parquet_path(dataset_id: int) -> str:
+    """Path of the columnar copy written for a dataset at upload time"""
+    return os.path.join(settings.UPLOAD_DIR, f"{dataset_id}.parquet")
+
+def write_parquet(target: str, df: pd.DataFrame) -> bool:
+    """Persist a parsed dataset as zstd-compressed Parquet so later reads skip text parsing"""
+    try:
+        df.to_parquet(target, engine='pyarrow', compression='zstd', index=False)
+        return True
+    except Exception as e:
+        # Mixed-type object columns cannot always be mapped to Arrow; fall back to the source file
+        logger.warning(f"Could not write parquet copy {target}: {e}")
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+def _skip_long_row(row) -> str:
+    # Mirrors pandas' on_bad_lines='skip': only rows with extra fields are dropped, short rows abort
+    # the Arrow read so the pandas fallback can pad them with NaN
+    return 'skip' if row.actual_columns > row.expected_columns else 'error'
+
+def _csv_options(path: str) -> Tuple[pacsv.ReadOptions, pacsv.ParseOptions, pacsv.ConvertOptions]:
+    # 4 MiB blocks keep every parser thread busy without inflating per-block overhead
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=4 << 20)
+    parse_options = pacsv.ParseOptions(invalid_row_handler=_skip_long_row)
+    # Match pandas inference: empty strings are NaN and 0/1 stay integers
+    convert_options = pacsv.ConvertOptions(
+        strings_can_be_null=True,
+        true_values=['True', 'TRUE', 'true'],
+        false_values=['False', 'FALSE', 'false']
+    )
+    # pandas leaves date-like text as strings, so temporal columns inferred from the first block stay text
+    with pacsv.open_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options) as reader:
+        temporal = {field.name: pa.string() for field in reader.schema if pa.types.is_temporal(field.type)}
+    if temporal:
+        convert_options.column_types = temporal
+    return read_options, parse_options, convert_options
+
+def read_csv_table(path: str) -> Optional[pa.Table]:
+    """Parse a CSV with Arrow's multithreaded reader; None when the file needs the pandas parser"""
+    try:
+        table = pacsv.read_csv(path, *_csv_options(path))
+    except pa.ArrowInvalid as e:
+        logger.info(f"Arrow could not parse {path}, using pandas: {e}")
+        return None
+    
+    # Arrow keeps non-UTF-8 text as raw bytes; let pandas handle (and report) such files as before
+    if any(pa.types.is_binary(field.type) for field in table.schema):
+        return None
+    return table
+
+def read_csv(path: str) -> pd.DataFrame:
+    """Parse a CSV with Arrow's multithreaded reader, falling back to pandas on input it rejects"""
+    table = read_csv_table(path)
+    if table is None:
+        return pd.read_csv(path, encoding='utf-8', on_bad_lines='skip')
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+def read_file(path: str) -> pd.DataFrame:
+    """Load a Parquet, CSV or Excel file into a DataFrame"""
+    if path.endswith('.parquet'):
+        return pq.read_table(path).to_pandas(self_destruct=True)
+    if path.endswith('.csv'):
+        return read_csv(path)
+    return pd.read_excel(path, engine='calamine')
+
+def _resolve_source(dataset_id: int, path: str) -> str:
+    columnar = parquet_path(dataset_id)
+    if os.path.exists(columnar) and os.path.getmtime(columnar) >= os.path.getmtime(path):
+        return columnar
+    return path
+
+@lru_cache(maxsize=8)
+def _load_dataframe(dataset_id: int, path: str, mtime: float) -> pd.DataFrame:
+    return read_file(path)
+
+@lru_cache(maxsize=8)
+def _build_profile(dataset_id: int, path: str, mtime: float) -> Dict:
+    df = _load_dataframe(dataset_id, path, mtime)
+    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    
+    # One pass per statistic over the whole frame rather than one scan per column
+    dtypes = df.dtypes.astype(str)
+    nuniques = df.nunique(dropna=True)
+    nulls = df.isnull().sum()
+    head = df.iloc[:3]
+    
+    return {
+        'columns': {col: {
+            'type': dtypes[col],
+            'unique': int(nuniques[col]),
+            'missing': int(nulls[col]),
+            'sample': head[col].dropna().tolist()
+        } for col in df.columns},
+        'numeric_cols': numeric_cols,
+        'categorical_cols': categorical_cols,
+        'describe': df[numeric_cols].describe() if numeric_cols else None
+    }
+
+def _footer_null_counts(parquet_file: pq.ParquetFile) -> List[Optional[int]]:
+    # Null counts per column summed over the row-group statistics; None where a column has none recorded
+    metadata = parquet_file.metadata
+    if metadata.num_columns != len(parquet_file.schema_arrow):
+        # Nested columns span several leaves, so the footer cannot be read per column
+        return [None] * len(parquet_file.schema_arrow)
+    counts = []
+    for i in range(metadata.num_columns):
+        stats = [metadata.row_group(rg).column(i).statistics for rg in range(metadata.num_row_groups)]
+        if all(stat is not None and stat.has_null_count for stat in stats):
+            counts.append(sum(stat.null_count for stat in stats))
+        else:
+            counts.append(None)
+    return counts
+
+def _describe(numeric: pd.DataFrame) -> Dict:
+    # describe() gives NaN for e.g. the std of a single row and inf for columns holding infinities,
+    # neither of which PostgreSQL's JSON type accepts, so they are stored as null
+    return {
+        col: {stat: value if not isinstance(value, float) or math.isfinite(value) else None for stat, value in stats.items()}
+        for col, stats in numeric.describe().to_dict().items()
+    }
+
+def _pandas_dtypes(schema: pa.Schema, null_counts: List[int]) -> pd.DataFrame:
+    # Column names and dtypes as pandas would report them, without converting any data. An empty
+    # table has no nulls, so the columns pandas widens when they hold some are widened here:
+    # integers to float64, booleans to object
+    empty = schema.empty_table().to_pandas()
+    for col, field, nulls in zip(empty.columns.tolist(), schema, null_counts):
+        if nulls and pa.types.is_integer(field.type):
+            empty[col] = empty[col].astype('float64')
+        elif nulls and pa.types.is_boolean(field.type):
+            empty[col] = empty[col].astype(object)
+    return empty
+
+def _arrow_summary(schema: pa.Schema, num_rows: int, null_counts: List[int], read_columns: Callable[[List[str]], pa.Table]) -> Dict:
+    empty = _pandas_dtypes(schema, null_counts)
+    fields = dict(zip(empty.columns, schema.names))
+    numeric_cols = empty.select_dtypes(include=['number']).columns.tolist()
+    numeric_summary = {}
+    if numeric_cols:
+        # Only the numeric columns are converted to pandas, for describe()
+        numeric = read_columns([fields[col] for col in numeric_cols]).to_pandas()
+        numeric.columns = numeric_cols
+        numeric_summary = _describe(numeric)
+    return {
+        'row_count': num_rows,
+        'column_count': len(empty.columns),
+        'columns': empty.columns.tolist(),
+        'dtypes': {col: str(dtype) for col, dtype in empty.dtypes.items()},
+        'missing_summary': dict(zip(empty.columns, null_counts)),
+        'numeric_summary': numeric_summary
+    }
+
+def summarize(df: pd.DataFrame) -> Dict:
+    """Row count, schema, null counts and numeric summary of a parsed dataset"""
+    numeric = df.select_dtypes(include=['number'])
+    return {
+        'row_count': len(df),
+        'column_count': len(df.columns),
+        'columns': df.columns.tolist(),
+        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'missing_summary': {col: int(count) for col, count in df.isnull().sum().items()},
+        'numeric_summary': _describe(df) if not numeric.empty else {}
+    }
+
+def _stream_csv_to_parquet(path: str, target: str) -> Optional[Tuple[pa.Schema, int, List[int]]]:
+    # Batch by batch, so memory stays at one parse block whatever the file size. None when Arrow
+    # rejects the file, possibly partway through, in which case nothing is left at the target
+    try:
+        with pacsv.open_csv(path, *_csv_options(path)) as reader:
+            schema = reader.schema
+            # Arrow keeps non-UTF-8 text as raw bytes; let pandas handle (and report) such files as before
+            if any(pa.types.is_binary(field.type) for field in schema):
+                return None
+            num_rows = 0
+            null_counts = [0] * len(schema)
+            with pq.ParquetWriter(target, schema, compression='zstd') as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    num_rows += batch.num_rows
+                    for i, column in enumerate(batch.columns):
+                        null_counts[i] += column.null_count
+    except pa.ArrowInvalid as e:
+        logger.info(f"Arrow could not parse {path}, using pandas: {e}")
+        if os.path.exists(target):
+            os.remove(target)
+        return None
+    return schema, num_rows, null_counts
+
+def ingest(target: str, path: str) -> Dict:
+    """Write the Parquet copy of a freshly uploaded file to target and return its summary.
+
+    CSVs Arrow can parse are streamed into the copy, and only their numeric columns are read
+    back for describe(), so the whole file is never held in memory. Excel files and CSVs that
+    need the pandas parser are loaded as a frame, as before. No copy is left at target when
+    the file cannot be mapped to Arrow.
+    """
+    streamed = _stream_csv_to_parquet(path, target) if path.endswith('.csv') else None
+    if streamed is not None:
+        schema, num_rows, null_counts = streamed
+        return _arrow_summary(schema, num_rows, null_counts, lambda names: pq.read_table(target, columns=names))
+    
+    df = read_file(path)
+    write_parquet(target, df)
+    return summarize(df)
+
+@lru_cache(maxsize=8)
+def _build_shape(dataset_id: int, path: str, mtime: float) -> Dict:
+    if path.endswith('.parquet'):
+        # Everything comes from the footer; no column data is read
+        parquet_file = pq.ParquetFile(path)
+        schema = parquet_file.schema_arrow
+        # Columns whose footer has no null count are read to find out
+        null_counts = [
+            count if count is not None else pq.read_table(path, columns=[field.name]).column(0).null_count
+            for field, count in zip(schema, _footer_null_counts(parquet_file))
+        ]
+        columns = _pandas_dtypes(schema, null_counts)
+        num_rows = parquet_file.metadata.num_rows
+    else:
+        columns = _load_dataframe(dataset_id, path, mtime)
+        num_rows = len(columns)
+    return {
+        'row_count': num_rows,
+        'column_count': len(columns.columns),
+        'dtypes': {col: str(dtype) for col, dtype in columns.dtypes.items()}
+    }
+
+def get_dataframe(dataset_id: int, path: str) -> pd.DataFrame:
+    """Return the parsed dataset, re-reading only when the underlying file has changed.
+
+    Reads the Parquet copy when one is present and up to date, otherwise the uploaded file.
+    The returned frame is shared between requests and must not be mutated.
+    """
+    source = _resolve_source(dataset_id, path)
+    return _load_dataframe(dataset_id, source, os.path.getmtime(source))
+
+def get_version(dataset_id: int, path: str) -> float:
+    """Modification time of the file the dataset is read from, for keying derived caches"""
+    return os.path.getmtime(_resolve_source(dataset_id, path))
+
+def source_key(path: str) -> str:
+    """Content key of an uploaded file from its name, size and modification time"""
+    stat = os.stat(path)
+    raw = f"{stat.st_size}:{stat.st_mtime_ns}:{os.path.basename(path)}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+def get_profile(dataset_id: int, path: str) -> Dict:
+    """Return the per-column profile and numeric summary used to build dashboard prompts"""
+    source = _resolve_source(dataset_id, path)
+    return _build_profile(dataset_id, source, os.path.getmtime(source))
+
+def get_shape(dataset_id: int, path: str) -> Dict:
+    """Return the row count, column count and dtypes, from the Parquet footer when there is a copy"""
+    source = _resolve_source(dataset_id, path)
+    return _build_shape(dataset_id, source, os.path.getmtime(source))
@@ -16,8 +16,10 @@ class SHAPExplainer:
             return {'error': 'No numeric features for explanation'}
         
         try:
-            self.explainer = shap.Explainer(model.predict, numeric_df)
-            self.shap_values = self.explainer(numeric_df)
+            # Detectors are fitted on plain matrices, so the explainer passes one to predict as well
+            X = numeric_df.to_numpy()
+            self.explainer = shap.Explainer(model.predict, X)
+            self.shap_values = self.explainer(X)
             
             explanations = {}
             for idx in anomaly_indices[:10]:
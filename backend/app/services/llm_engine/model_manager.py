@@ -1,9 +1,9 @@
 import subprocess
-import asyncio
 import logging
+import orjson
 from typing import Optional, List, Dict
-import httpx
 from datetime import datetime
+from app.services.llm_engine.ollama_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +18,20 @@ class ModelManager:
     async def get_available_models(self) -> List[Dict]:
         """Get list of available Ollama models"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.ollama_base_url}/api/tags")
-                if response.status_code == 200:
-                    data = response.json()
-                    return [
-                        {
-                            "name": model["name"],
-                            "size": model.get("size", 0),
-                            "modified": model.get("modified_at", ""),
-                            "digest": model.get("digest", "")
-                        }
-                        for model in data.get("models", [])
-                    ]
-                return []
+            # The pool shared with generation requests, so listing models reuses a kept-alive connection
+            response = await get_http_client().get(f"{self.ollama_base_url}/api/tags", timeout=5.0)
+            if response.status_code == 200:
+                data = response.json()
+                return [
+                    {
+                        "name": model["name"],
+                        "size": model.get("size", 0),
+                        "modified": model.get("modified_at", ""),
+                        "digest": model.get("digest", "")
+                    }
+                    for model in data.get("models", [])
+                ]
+            return []
         except Exception as e:
             logger.error(f"Failed to get available models: {e}")
             return []
@@ -41,41 +41,60 @@ class ModelManager:
         models = await self.get_available_models()
         return any(m["name"] == model_name for m in models)
     
+    def _pull_progress(self, event: Dict) -> str:
+        # Download events carry byte counts; show them as a whole percentage
+        status = event.get("status", "")
+        if event.get("total"):
+            return f"{status} {event.get('completed', 0) * 100 // event['total']}%"
+        return status
+    
     async def pull_model_stream(self, model_name: str):
         """Pull model with streaming progress"""
-        cmd = ["ollama", "pull", model_name]
-        
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-                text=True
-            )
-            
-            async for line in process.stdout:
-                line = line.strip()
-                if line:
-                    yield {
-                        "type": "log",
-                        "content": line,
-                        "timestamp": datetime.now().isoformat()
-                    }
-            
-            await process.wait()
+            # Ollama's pull API streams one JSON progress object per line over the shared pool
+            async with get_http_client().stream(
+                "POST",
+                f"{self.ollama_base_url}/api/pull",
+                json={"name": model_name, "stream": True}
+            ) as response:
+                response.raise_for_status()
+                last_line = None
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    event = orjson.loads(line)
+                    
+                    if event.get("error"):
+                        yield {
+                            "type": "error",
+                            "content": f"Failed to pull model {model_name}: {event['error']}",
+                            "timestamp": datetime.now().isoformat()
+                        }
+                        return
+                    
+                    if event.get("status") == "success":
+                        yield {
+                            "type": "success",
+                            "content": f"Model {model_name} pulled successfully",
+                            "timestamp": datetime.now().isoformat()
+                        }
+                        return
+                    
+                    # A download reports every chunk; only a new status or percentage becomes a log line
+                    content = self._pull_progress(event)
+                    if content and content != last_line:
+                        last_line = content
+                        yield {
+                            "type": "log",
+                            "content": content,
+                            "timestamp": datetime.now().isoformat()
+                        }
             
-            if process.returncode == 0:
-                yield {
-                    "type": "success",
-                    "content": f"Model {model_name} pulled successfully",
-                    "timestamp": datetime.now().isoformat()
-                }
-            else:
-                yield {
-                    "type": "error",
-                    "content": f"Failed to pull model {model_name}",
-                    "timestamp": datetime.now().isoformat()
-                }
+            yield {
+                "type": "error",
+                "content": f"Failed to pull model {model_name}",
+                "timestamp": datetime.now().isoformat()
+            }
                 
         except Exception as e:
             logger.error(f"Error pulling model: {e}")
@@ -90,11 +109,11 @@ class ModelManager:
         try:
             # Ollama automatically manages model lifecycle
             # We just need to unload the current model from memory
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.ollama_base_url}/api/generate",
-                    json={"model": self.current_model, "keep_alive": 0}
-                )
+            await get_http_client().post(
+                f"{self.ollama_base_url}/api/generate",
+                json={"model": self.current_model, "keep_alive": 0},
+                timeout=5.0
+            )
             logger.info(f"Stopped model: {self.current_model}")
             return True
         except Exception as e:
@@ -111,15 +130,15 @@ class ModelManager:
             self.current_model = new_model
             
             # Warm up new model
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.ollama_base_url}/api/generate",
-                    json={
-                        "model": new_model,
-                        "prompt": "Hello",
-                        "stream": False
-                    }
-                )
+            await get_http_client().post(
+                f"{self.ollama_base_url}/api/generate",
+                json={
+                    "model": new_model,
+                    "prompt": "Hello",
+                    "stream": False
+                },
+                timeout=30.0
+            )
             
             logger.info(f"Switched to model: {new_model}")
             return True
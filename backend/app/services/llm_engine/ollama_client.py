@@ -1,22 +1,120 @@
-import requests
+import asyncio
+import copy
+import hashlib
+import httpx
 import json
 import logging
-from typing import Dict, List, Optional
+import orjson
+import random
+from cachetools import TTLCache
+from contextlib import aclosing
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Caps generations sent to Ollama at once; past its parallel slots extra requests only add queueing delay
+ollama_semaphore = asyncio.Semaphore(settings.OLLAMA_MAX_CONCURRENCY)
+
+_json_decoder = json.JSONDecoder()
+
+# Generation payloads are encoded with orjson, so the content type is set by hand
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Connection failures seen while Ollama swaps or reloads a model; they pass once it is serving again.
+# Read timeouts are not retried, since OLLAMA_TIMEOUT already allows minutes per generation
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError)
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client so every Ollama request reuses keep-alive connections"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            # Generation may take minutes, but an unreachable Ollama should fail fast
+            timeout=httpx.Timeout(settings.OLLAMA_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30)
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared client's connections on application shutdown"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+CLEANING_SYSTEM_PROMPT = """You are an expert data scientist specializing in data quality.
+Analyze the provided data profile and quality issues, then recommend specific
+cleaning strategies with detailed reasoning. Respond in valid JSON format only."""
+
+CLEANING_STRATEGY_SHAPE = """{
+  "priority_ranking": [
+    {"issue": "...", "severity": "high/medium/low", "impact": "..."}
+  ],
+  "strategies": [
+    {
+      "issue_type": "...",
+      "affected_columns": [...],
+      "root_cause": "...",
+      "recommended_approach": {
+        "method": "...",
+        "steps": [...]
+      },
+      "expected_improvement": "...",
+      "risks": [...]
+    }
+  ],
+  "implementation_order": [...],
+  "success_metrics": {}
+}"""
+
+# Top-level keys that mark a decoded object as a whole cleaning strategy, or as a batch of them
+STRATEGY_KEYS = ("priority_ranking", "strategies")
+BATCH_KEYS = ("datasets",)
+
+# Output budget for a cleaning strategy: a fixed part for the ranking and order, plus one strategy per issue
+STRATEGY_BASE_TOKENS = 256
+STRATEGY_TOKENS_PER_ISSUE = 128
+
+def _strategy_budget(quality_issues: List[Dict]) -> int:
+    # Only the top five issues are put in the prompt
+    return STRATEGY_BASE_TOKENS + STRATEGY_TOKENS_PER_ISSUE * len(quality_issues[:5])
+
+def _describe_dataset(data_profile: Dict, quality_issues: List[Dict]) -> str:
+    # Limit prompt size for 8GB RAM
+    # Only include essential info
+    return f"""Data Profile Summary:
+- Rows: {data_profile.get('row_count', 'N/A')}
+- Columns: {data_profile.get('column_count', 'N/A')}
+- Data Types: {data_profile.get('data_types', 'N/A')}
+
+Quality Issues (Top 5):
+{json.dumps(quality_issues[:5], indent=2)}"""
+
+def _strategy_key(data_profile: Dict, quality_issues: List[Dict]) -> str:
+    # Keyed on the prompt text itself, so profiles that differ only in fields the prompt leaves out share an entry
+    return hashlib.blake2b(_describe_dataset(data_profile, quality_issues).encode(), digest_size=16).hexdigest()
+
+class OllamaStreamError(Exception):
+    """A streamed generation failed after some of the reply had already been yielded"""
+
 class OllamaClient:
     def __init__(self, base_url: str = None, model: str = None):
         self.base_url = base_url or settings.OLLAMA_BASE_URL
         self.model = model or settings.OLLAMA_MODEL
         self._session_counter = 0  # Track number of requests
+        # Parsed strategies keyed by prompt, so re-running recommendations on an unchanged dataset skips the model
+        self._strategy_cache = TTLCache(maxsize=settings.STRATEGY_CACHE_SIZE, ttl=settings.STRATEGY_CACHE_TTL)
         logger.info(f"Initialized OllamaClient with model: {self.model}")
     
     async def clear_context(self):
         """Force clear model context to free memory"""
         try:
-            response = requests.post(
+            response = await get_http_client().post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
@@ -30,57 +128,92 @@ class OllamaClient:
             logger.warning(f"Failed to clear context: {e}")
             return False
     
-    async def generate(
-        self,
-        prompt: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2000  # Reduced from 2000 for 8GB RAM
-    ) -> Dict:
-        """Generate completion from Ollama Gemma 2:2b with memory management"""
-        
+    def _payload(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> Dict:
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False,
+            "stream": True,
+            # Ollama unloads the model itself once it has been idle this long, so back-to-back
+            # requests never pay for a reload
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
             "options": {
                 "temperature": temperature,
-                "num_predict": max_tokens
+                "num_predict": max_tokens,
+                "num_ctx": settings.OLLAMA_NUM_CTX
             }
         }
         
         if system_prompt:
             payload["system"] = system_prompt
+        return payload
+    
+    async def _stream_chunks(self, payload: Dict) -> AsyncIterator[Dict]:
+        body = orjson.dumps(payload)
+        for attempt in range(1, settings.OLLAMA_RETRY_ATTEMPTS + 1):
+            started = False
+            try:
+                # The slot is held until the stream ends, since Ollama is generating for all of it
+                async with ollama_semaphore, get_http_client().stream(
+                    "POST", f"{self.base_url}/api/generate", content=body, headers=JSON_HEADERS
+                ) as response:
+                    response.raise_for_status()
+                    # Ollama streams one JSON object per line, one line per token, so each is parsed by orjson
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = orjson.loads(line)
+                        if chunk.get("error"):
+                            # Failures after the stream has started arrive as an error object rather than a status code
+                            raise RuntimeError(chunk["error"])
+                        started = True
+                        yield chunk
+                        if chunk.get("done"):
+                            return
+                return
+            except RETRYABLE_ERRORS as e:
+                # Once tokens have reached the caller a retry would repeat them, so only a failed start is retried
+                if started or attempt == settings.OLLAMA_RETRY_ATTEMPTS:
+                    raise
+                # Exponential backoff with full jitter, outside the slot so other requests can use it meanwhile
+                delay = random.uniform(0, min(settings.OLLAMA_RETRY_MAX_WAIT, 2 ** (attempt - 1)))
+                logger.warning(f"Ollama connection failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000  # Reduced from 2000 for 8GB RAM
+    ) -> Dict:
+        """Generate completion from Ollama Gemma 2:2b with memory management"""
+        
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens)
         
         try:
             # Increment request counter
             self._session_counter += 1
             logger.info(f"Request #{self._session_counter} to Ollama")
             
-            # Make request
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=settings.OLLAMA_TIMEOUT
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # Clear context every 3 requests to prevent memory buildup
-            if self._session_counter >= 3:
-                logger.warning(f" Reached {self._session_counter} requests - clearing context")
-                await self.clear_context()
-                self._session_counter = 0  # Reset counter
+            # Collected from the token stream, so a caller that is cancelled stops the generation at the
+            # next token, and the result has the same shape as a non-streamed reply
+            parts = []
+            result = {}
+            async with aclosing(self._stream_chunks(payload)) as chunks:
+                async for chunk in chunks:
+                    parts.append(chunk.get("response", ""))
+                    result = chunk
+            result["response"] = "".join(parts)
             
             return result
             
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error("Ollama request timed out")
             return {
                 "response": "Request timed out. Model may be overloaded. Try again.",
                 "error": True
             }
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             logger.error("Failed to connect to Ollama")
             return {
                 "response": "Cannot connect to Ollama. Ensure it's running on port 11434.",
@@ -93,6 +226,45 @@ class OllamaClient:
                 "error": True
             }
     
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """Yield response text fragments as Ollama decodes them.
+
+        A stream that fails before its first fragment just ends, as when the model has nothing to say;
+        one that fails partway raises OllamaStreamError, so callers can tell a cut-off reply from a
+        complete one.
+        """
+        
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens)
+        
+        self._session_counter += 1
+        logger.info(f"Streaming request #{self._session_counter} to Ollama")
+        
+        started = False
+        try:
+            async with aclosing(self._stream_chunks(payload)) as chunks:
+                async for chunk in chunks:
+                    if chunk.get("response"):
+                        started = True
+                        yield chunk["response"]
+        except httpx.TimeoutException as e:
+            logger.error("Ollama stream timed out")
+            if started:
+                raise OllamaStreamError("The model's reply was cut off: Ollama timed out") from e
+        except httpx.ConnectError as e:
+            logger.error("Failed to connect to Ollama")
+            if started:
+                raise OllamaStreamError("The model's reply was cut off: lost the connection to Ollama") from e
+        except Exception as e:
+            logger.error(f"Ollama streaming error: {e}")
+            if started:
+                raise OllamaStreamError(f"The model's reply was cut off: {e}") from e
+    
     async def generate_cleaning_strategy(
         self,
         data_profile: Dict,
@@ -100,73 +272,102 @@ class OllamaClient:
     ) -> Dict:
         """Generate data cleaning recommendations using Gemma 2:2b"""
         
-        system_prompt = """You are an expert data scientist specializing in data quality.
-Analyze the provided data profile and quality issues, then recommend specific
-cleaning strategies with detailed reasoning. Respond in valid JSON format only."""
+        key = _strategy_key(data_profile, quality_issues)
+        cached = self._strategy_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
         
-        # Limit prompt size for 8GB RAM
-        # Only include essential info
-        prompt = f"""Data Profile Summary:
-- Rows: {data_profile.get('row_count', 'N/A')}
-- Columns: {data_profile.get('column_count', 'N/A')}
-- Data Types: {data_profile.get('data_types', 'N/A')}
-
-Quality Issues (Top 5):
-{json.dumps(quality_issues[:5], indent=2)}
+        prompt = f"""{_describe_dataset(data_profile, quality_issues)}
 
 Provide concise recommendations in JSON:
-{{
-  "priority_ranking": [
-    {{"issue": "...", "severity": "high/medium/low", "impact": "..."}}
-  ],
-  "strategies": [
-    {{
-      "issue_type": "...",
-      "affected_columns": [...],
-      "root_cause": "...",
-      "recommended_approach": {{
-        "method": "...",
-        "steps": [...]
-      }},
-      "expected_improvement": "...",
-      "risks": [...]
-    }}
-  ],
-  "implementation_order": [...],
-  "success_metrics": {{}}
-}}"""
+{CLEANING_STRATEGY_SHAPE}"""
         
         response = await self.generate(
             prompt=prompt,
-            system_prompt=system_prompt,
+            system_prompt=CLEANING_SYSTEM_PROMPT,
             temperature=0.3,
-            max_tokens=2000  # Allow more tokens for this specific use case
+            max_tokens=_strategy_budget(quality_issues)
+        )
+        
+        strategy = self._parse_response(response.get('response', ''))
+        self._cache_strategy(key, strategy)
+        return strategy
+    
+    def _cache_strategy(self, key: str, strategy: Dict):
+        # Unparsed replies and errors are not kept, so the next request asks the model again
+        if strategy.get('parsed', True) is not False:
+            self._strategy_cache[key] = copy.deepcopy(strategy)
+    
+    async def generate_cleaning_strategies(self, requests: List[Tuple[Dict, List[Dict]]]) -> List[Dict]:
+        """Cleaning recommendations for several datasets from one generation, in request order"""
+        # Datasets answered before are served from the cache and only the rest go to the model
+        keys = [_strategy_key(*request) for request in requests]
+        results = [self._strategy_cache.get(key) for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if len(misses) < len(requests):
+            generated = await self.generate_cleaning_strategies([requests[i] for i in misses]) if misses else []
+            for i, strategy in zip(misses, generated):
+                results[i] = strategy
+            return [result if i in misses else copy.deepcopy(result) for i, result in enumerate(results)]
+        
+        if len(requests) == 1:
+            return [await self.generate_cleaning_strategy(*requests[0])]
+        
+        datasets = "\n\n".join(
+            f"Dataset {i}:\n{_describe_dataset(data_profile, quality_issues)}"
+            for i, (data_profile, quality_issues) in enumerate(requests, 1)
         )
+        prompt = f"""{datasets}
+
+Provide concise recommendations for each dataset in JSON, as {{"datasets": [...]}} with one
+object per dataset in the order above, each shaped like:
+{CLEANING_STRATEGY_SHAPE}"""
+
+        response = await self.generate(
+            prompt=prompt,
+            system_prompt=CLEANING_SYSTEM_PROMPT,
+            temperature=0.3,
+            max_tokens=sum(_strategy_budget(quality_issues) for _, quality_issues in requests)
+        )
+        
+        strategies = self._parse_response(response.get('response', ''), BATCH_KEYS).get('datasets')
+        if isinstance(strategies, list) and len(strategies) == len(requests) and all(isinstance(item, dict) for item in strategies):
+            for key, strategy in zip(keys, strategies):
+                self._cache_strategy(key, strategy)
+            return strategies
         
-        return self._parse_response(response.get('response', ''))
+        # A small model does not always keep the datasets apart; answer each on its own instead
+        logger.warning(f"Batched response did not cover all {len(requests)} datasets, generating them separately")
+        return list(await asyncio.gather(*[self.generate_cleaning_strategy(*request) for request in requests]))
     
-    def _parse_response(self, response: str) -> Dict:
+    def _parse_response(self, response: str, expected_keys: Tuple[str, ...] = STRATEGY_KEYS) -> Dict:
         """Parse LLM response into structured format"""
-        try:
-            # Find JSON in response
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                return {
-                    "raw_response": response,
-                    "parsed": False
-                }
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {e}")
+        start_idx = response.find('{')
+        if start_idx == -1:
             return {
                 "raw_response": response,
-                "parsed": False,
-                "error": str(e)
+                "parsed": False
             }
+        # Decodes the first object in place and stops at its closing brace, so chatter or braces
+        # after it no longer break the parse; a brace in prose before the object moves on to the next one.
+        # Only an object with the expected top-level keys is taken: in a truncated reply the first
+        # object that decodes is a nested entry, which must not be mistaken for the whole answer
+        error = None
+        while start_idx != -1:
+            try:
+                parsed, _ = _json_decoder.raw_decode(response, start_idx)
+                if isinstance(parsed, dict) and any(key in parsed for key in expected_keys):
+                    return parsed
+            except json.JSONDecodeError as e:
+                error = error or e
+            start_idx = response.find('{', start_idx + 1)
+        error = error or f"No JSON object with any of the keys {', '.join(expected_keys)}"
+        logger.error(f"Failed to parse JSON response: {error}")
+        return {
+            "raw_response": response,
+            "parsed": False,
+            "error": str(error)
+        }
     
     def reset_counter(self):
         """Manually reset request counter"""
@@ -176,3 +377,77 @@ Provide concise recommendations in JSON:
     def get_request_count(self) -> int:
         """Get current request count"""
         return self._session_counter
+
+class BatchingCoalescer:
+    """Collects cleaning-strategy requests that arrive close together and answers them with one generation"""
+    
+    def __init__(self, client: OllamaClient, window: float, max_batch: int):
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Dict, List[Dict], asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks, so running batches are held here
+        # until they finish; a collected batch would leave its callers waiting forever
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def submit(self, data_profile: Dict, quality_issues: List[Dict]) -> Dict:
+        """Queue one dataset for the next batch and wait for its own strategy"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((data_profile, quality_issues, future))
+        if len(self._pending) >= self.max_batch:
+            self._spawn(self._run(self._take()))
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_after_window())
+        return await future
+    
+    def _take(self) -> List[Tuple[Dict, List[Dict], asyncio.Future]]:
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        return batch
+    
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        while self._pending:
+            self._spawn(self._run(self._take()))
+    
+    async def _run(self, batch: List[Tuple[Dict, List[Dict], asyncio.Future]]):
+        # Callers that went away while waiting are dropped before anything is generated for them
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+        try:
+            strategies = await self.client.generate_cleaning_strategies([(profile, issues) for profile, issues, _ in batch])
+            for (_, _, future), strategy in zip(batch, strategies):
+                if not future.done():
+                    future.set_result(strategy)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Whatever ends the batch early, a cancellation or an answer short of a dataset,
+            # no caller is left waiting on a future nothing will resolve
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Strategy batch ended without a result for this dataset"))
+
+@lru_cache(maxsize=1)
+def get_ollama_client() -> OllamaClient:
+    """Process-wide client for the configured model, shared by every route that talks to Ollama"""
+    return OllamaClient()
+
+@lru_cache(maxsize=1)
+def get_strategy_batcher() -> BatchingCoalescer:
+    """Process-wide coalescer for cleaning-strategy requests"""
+    return BatchingCoalescer(
+        get_ollama_client(),
+        window=settings.LLM_BATCH_WINDOW_MS / 1000,
+        max_batch=settings.LLM_BATCH_MAX_SIZE
+    )
@@ -1,19 +1,37 @@
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
+import threading
+from functools import lru_cache
 import numpy as np
 from app.core.config import settings
 
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_embedding_models: Dict[str, SentenceTransformer] = {}
+_embedding_models_lock = threading.Lock()
+
+def get_embedding_model(name: str = EMBEDDING_MODEL_NAME) -> SentenceTransformer:
+    """Embedding model loaded once per process, so every knowledge base shares one copy of the weights"""
+    with _embedding_models_lock:
+        if name not in _embedding_models:
+            _embedding_models[name] = SentenceTransformer(name)
+    return _embedding_models[name]
+
 class RAGSystem:
     """Retrieval Augmented Generation for data quality knowledge - Simplified"""
     
     def __init__(self, persist_directory: str = None):
         # Initialize embedding model (runs locally)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = get_embedding_model()
         
-        # Initialize in-memory knowledge base
+        # Initialize in-memory knowledge base; embeddings are unit-length float16 rows, one per item,
+        # since cosine ranking survives the precision loss and the matrix takes half the memory
         self.knowledge_base = []
-        self.embeddings = []
+        self.embeddings = np.empty((0, self.embedding_model.get_sentence_embedding_dimension()), dtype=np.float16)
+        
+        # Issue queries repeat across datasets, so their embeddings are kept per instance
+        self._encode_query = lru_cache(maxsize=512)(self._encode)
         
         # Initialize with domain knowledge
         self._initialize_knowledge_base()
@@ -73,20 +91,36 @@ class RAGSystem:
             }
         ]
         
-        for item in knowledge_items:
-            text = f"{item['pattern']} | {item['diagnosis']} | {item['solution']}"
-            self.add_knowledge(item['id'], text, item)
+        # All items go through the embedding model in one batched forward pass
+        texts = [f"{item['pattern']} | {item['diagnosis']} | {item['solution']}" for item in knowledge_items]
+        self.embeddings = self.embedding_model.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float16)
+        self.knowledge_base = [
+            {'id': item['id'], 'text': text, 'metadata': item}
+            for item, text in zip(knowledge_items, texts)
+        ]
     
     def add_knowledge(self, id: str, text: str, metadata: Dict):
         """Add knowledge to RAG system"""
-        embedding = self.embedding_model.encode(text)
+        embedding = self.embedding_model.encode(text, normalize_embeddings=True).astype(np.float16)
         
         self.knowledge_base.append({
             'id': id,
             'text': text,
             'metadata': metadata
         })
-        self.embeddings.append(embedding)
+        self.embeddings = np.vstack([self.embeddings, embedding])
+    
+    def _encode(self, query: str) -> np.ndarray:
+        embedding = self.embedding_model.encode(query, normalize_embeddings=True).astype(np.float32)
+        # Shared by every later call with the same query
+        embedding.flags.writeable = False
+        return embedding
+    
+    def clear_cache(self):
+        """Forget cached query embeddings"""
+        self._encode_query.cache_clear()
     
     def retrieve_relevant_knowledge(
         self,
@@ -98,24 +132,32 @@ class RAGSystem:
         if not self.knowledge_base:
             return []
         
-        query_embedding = self.embedding_model.encode(query)
+        query_embedding = self._encode_query(query)
         
-        # Calculate cosine similarities
-        similarities = []
-        for i, emb in enumerate(self.embeddings):
-            similarity = np.dot(query_embedding, emb) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(emb)
-            )
-            similarities.append((i, similarity))
+        # Rows and query are unit length, so one matrix-vector product gives every cosine similarity.
+        # NumPy has no BLAS kernel for float16, so the product runs in float32
+        similarities = np.matmul(self.embeddings, query_embedding, dtype=np.float32)
         
-        # Sort by similarity
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # Partition out the top n, then order only those
+        n = min(n_results, len(similarities))
+        top = np.argpartition(-similarities, n - 1)[:n]
+        top = top[np.argsort(-similarities[top], kind='stable')]
         
-        # Get top n results
         results = []
-        for idx, sim in similarities[:n_results]:
+        for idx in top:
             item = self.knowledge_base[idx].copy()
-            item['similarity'] = float(sim)
+            item['similarity'] = float(similarities[idx])
             results.append(item)
         
         return results
+
+_rag_system: Optional[RAGSystem] = None
+_rag_system_lock = threading.Lock()
+
+def get_rag_system() -> RAGSystem:
+    """Process-wide knowledge base, built once since it loads the embedding model"""
+    global _rag_system
+    with _rag_system_lock:
+        if _rag_system is None:
+            _rag_system = RAGSystem()
+    return _rag_system
@@ -0,0 +1,16 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.cache import memoize_request
+from app.models.database_models import DatasetMetadata, QualityAssessment
+
+@memoize_request
+def get_dataset(db: Session, dataset_id: int) -> Optional[DatasetMetadata]:
+    """Dataset metadata row by id"""
+    return db.get(DatasetMetadata, dataset_id)
+
+@memoize_request
+def latest_assessment(db: Session, dataset_id: int) -> Optional[QualityAssessment]:
+    """Most recent quality assessment of a dataset"""
+    return db.query(QualityAssessment).filter(
+        QualityAssessment.dataset_id == dataset_id
+    ).order_by(QualityAssessment.assessment_timestamp.desc()).first()
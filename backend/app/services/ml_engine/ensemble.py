@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple
+from .features import numeric_frame, numeric_matrix
 from .isolation_forest import IsolationForestDetector
 from .lof_detector import LOFDetector
 from .ocsvm_detector import OCSVMDetector
@@ -20,7 +22,7 @@ class AnomalyEnsemble:
         }
     
     def detect_anomalies(self, df: pd.DataFrame) -> Dict:
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = numeric_frame(df)
         
         if numeric_df.empty:
             return {
@@ -33,9 +35,15 @@ class AnomalyEnsemble:
         all_predictions = {}
         all_scores = {}
         
-        for name, model in self.models.items():
+        # The detectors share one filled float32 matrix of the numeric columns, so the frame is converted
+        # once rather than by each fit, and fit side by side, since scikit-learn releases the GIL in their native code
+        X = numeric_matrix(numeric_df)
+        with ThreadPoolExecutor(max_workers=len(self.models)) as executor:
+            futures = {name: executor.submit(model.detect_prepared, X) for name, model in self.models.items()}
+        
+        for name, future in futures.items():
             try:
-                anomalies, scores = model.detect(df)
+                anomalies, scores = future.result()
                 all_predictions[name] = anomalies
                 all_scores[name] = scores
             except Exception as e:
@@ -43,17 +51,15 @@ class AnomalyEnsemble:
                 all_predictions[name] = np.zeros(len(df), dtype=bool)
                 all_scores[name] = np.zeros(len(df))
         
+        # Each model's scores are normalized and weighted in one scratch buffer and added in place
         ensemble_scores = np.zeros(len(df))
+        buffer = np.empty(len(df))
         for name, weight in self.weights.items():
             if name in all_scores:
-                normalized_scores = self._normalize_scores(all_scores[name])
-                ensemble_scores += weight * normalized_scores
-        
-        threshold = np.percentile(ensemble_scores, (1 - self.contamination) * 100)
-        ensemble_anomalies = ensemble_scores > threshold
-        
-        anomaly_indices = np.where(ensemble_anomalies)[0].tolist()
+                self._add_normalized(all_scores[name], weight, ensemble_scores, buffer)
         
+        anomaly_indices = self._top_scores(ensemble_scores)
+
         feature_importance = {}
         if len(anomaly_indices) > 0:
             for name, model in self.models.items():
@@ -74,15 +80,40 @@ class AnomalyEnsemble:
             'feature_importance': feature_importance
         }
     
-    def _normalize_scores(self, scores: np.ndarray) -> np.ndarray:
+    def _top_scores(self, scores: np.ndarray) -> List[int]:
+        """Indices of the contamination share of highest scores, most anomalous first"""
+        n = len(scores)
+        if n == 0:
+            return []
+        k = min(max(1, int(self.contamination * n)), n)
+
+        # One O(N) selection replaces the percentile sort plus the mask and where passes
+        if k < n:
+            candidates = np.argpartition(-scores, k)[:k + 1]
+            boundary = scores[candidates[k]]
+            top = candidates[:k]
+            # Rows tied with the first unselected score are not more anomalous than it, as with a strict threshold
+            top = top[scores[top] > boundary]
+        else:
+            # When int(contamination * n) >= n every row is selected, and the same strict rule applies with
+            # the lowest score as the boundary: only rows scoring above it are flagged, so a single row,
+            # or rows all scoring the same, are not anomalies
+            top = np.flatnonzero(scores > scores.min())
+
+        return top[np.argsort(-scores[top], kind='stable')].tolist()
+
+    def _add_normalized(self, scores: np.ndarray, weight: float, out: np.ndarray, buffer: np.ndarray):
         if len(scores) == 0:
-            return scores
+            return
         
-        scores = np.abs(scores)
-        min_score = scores.min()
-        max_score = scores.max()
+        np.abs(scores, out=buffer)
+        min_score = buffer.min()
+        max_score = buffer.max()
         
         if max_score - min_score == 0:
-            return np.zeros_like(scores)
+            return
         
-        return (scores - min_score) / (max_score - min_score)
+        np.subtract(buffer, min_score, out=buffer)
+        np.divide(buffer, max_score - min_score, out=buffer)
+        np.multiply(buffer, weight, out=buffer)
+        np.add(out, buffer, out=out)
@@ -2,6 +2,7 @@ from sklearn.ensemble import IsolationForest
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple
+from .features import mean_gap_importance, numeric_frame, numeric_matrix
 
 class IsolationForestDetector:
     def __init__(self, contamination: float = 0.1, random_state: int = 42):
@@ -13,32 +14,20 @@ class IsolationForestDetector:
         self.contamination = contamination
     
     def detect(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = numeric_frame(df)
         
         if numeric_df.empty:
             return np.array([]), np.array([])
         
-        numeric_df = numeric_df.fillna(numeric_df.mean())
-        predictions = self.model.fit_predict(numeric_df)
-        scores = self.model.score_samples(numeric_df)
+        return self.detect_prepared(numeric_matrix(numeric_df))
+    
+    def detect_prepared(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fit and score a numeric matrix that already has its gaps filled"""
+        predictions = self.model.fit_predict(X)
+        scores = self.model.score_samples(X)
         
         anomalies = predictions == -1
         return anomalies, scores
     
     def get_feature_importance(self, df: pd.DataFrame, anomaly_indices: np.ndarray) -> Dict:
-        numeric_df = df.select_dtypes(include=[np.number])
-        
-        if numeric_df.empty or len(anomaly_indices) == 0:
-            return {}
-        
-        importance = {}
-        for col in numeric_df.columns:
-            anomaly_mean = numeric_df.loc[anomaly_indices, col].mean()
-            normal_mean = numeric_df.loc[~anomaly_indices, col].mean()
-            importance[col] = abs(anomaly_mean - normal_mean)
-        
-        total = sum(importance.values())
-        if total > 0:
-            importance = {k: v/total for k, v in importance.items()}
-        
-        return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
+        return mean_gap_importance(df, anomaly_indices)
@@ -2,42 +2,54 @@ from sklearn.neighbors import LocalOutlierFactor
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple
+from .features import mean_gap_importance, numeric_frame, numeric_matrix
+
+class NeighborTrackingLOF(LocalOutlierFactor):
+    """LocalOutlierFactor that keeps the neighbour indices its fit already computes"""
+    
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        result = super().kneighbors(X, n_neighbors, return_distance)
+        if X is None and return_distance:
+            self.neighbor_indices_ = result[1]
+        return result
 
 class LOFDetector:
     def __init__(self, n_neighbors: int = 20, contamination: float = 0.1):
-        self.model = LocalOutlierFactor(
+        self.model = NeighborTrackingLOF(
             n_neighbors=n_neighbors,
             contamination=contamination
         )
         self.contamination = contamination
+        self._X = None
     
     def detect(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = numeric_frame(df)
         
         if numeric_df.empty:
             return np.array([]), np.array([])
         
-        numeric_df = numeric_df.fillna(numeric_df.mean())
-        predictions = self.model.fit_predict(numeric_df)
+        return self.detect_prepared(numeric_matrix(numeric_df))
+    
+    def detect_prepared(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fit and score a numeric matrix that already has its gaps filled"""
+        predictions = self.model.fit_predict(X)
         scores = self.model.negative_outlier_factor_
+        self._X = X
         
         anomalies = predictions == -1
         return anomalies, scores
     
     def get_feature_importance(self, df: pd.DataFrame, anomaly_indices: np.ndarray) -> Dict:
-        numeric_df = df.select_dtypes(include=[np.number])
-        
-        if numeric_df.empty or len(anomaly_indices) == 0:
-            return {}
+        if self._X is None or len(self._X) != len(df) or len(anomaly_indices) == 0:
+            return mean_gap_importance(df, anomaly_indices)
         
-        importance = {}
-        for col in numeric_df.columns:
-            anomaly_mean = numeric_df.loc[anomaly_indices, col].mean()
-            normal_mean = numeric_df.loc[~anomaly_indices, col].mean()
-            importance[col] = abs(anomaly_mean - normal_mean)
+        # How far each anomaly sits from its own neighbours, per feature, using the graph built by the fit
+        neighbors = self.model.neighbor_indices_[anomaly_indices]
+        deviation = np.abs(self._X[anomaly_indices] - self._X[neighbors].mean(axis=1)).mean(axis=0)
         
-        total = sum(importance.values())
+        total = deviation.sum()
         if total > 0:
-            importance = {k: v/total for k, v in importance.items()}
+            deviation = deviation / total
         
-        return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
+        columns = numeric_frame(df).columns
+        return dict(sorted(zip(columns, deviation.tolist()), key=lambda x: x[1], reverse=True))
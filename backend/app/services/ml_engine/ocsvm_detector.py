@@ -1,40 +1,43 @@
 from sklearn.svm import OneClassSVM
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import SGDOneClassSVM
+from sklearn.pipeline import make_pipeline
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple
+from .features import mean_gap_importance, numeric_frame, numeric_matrix
+
+# The exact fit grows quadratically with the row count; past this many rows the RBF kernel is approximated
+EXACT_MAX_ROWS = 10000
 
 class OCSVMDetector:
     def __init__(self, nu: float = 0.1, kernel: str = 'rbf'):
         self.model = OneClassSVM(nu=nu, kernel=kernel, gamma='auto')
         self.nu = nu
+        self.kernel = kernel
     
     def detect(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = numeric_frame(df)
         
         if numeric_df.empty:
             return np.array([]), np.array([])
         
-        numeric_df = numeric_df.fillna(numeric_df.mean())
-        predictions = self.model.fit_predict(numeric_df)
-        scores = self.model.decision_function(numeric_df)
+        return self.detect_prepared(numeric_matrix(numeric_df))
+    
+    def detect_prepared(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fit and score a numeric matrix that already has its gaps filled"""
+        if self.kernel == 'rbf' and len(X) > EXACT_MAX_ROWS:
+            # Nystroem features make the one-class SVM linear in the row count; gamma matches 'auto'
+            self.model = make_pipeline(
+                Nystroem(kernel='rbf', gamma=1.0 / X.shape[1], n_components=100, random_state=42),
+                SGDOneClassSVM(nu=self.nu, random_state=42)
+            )
+        self.model.fit(X)
         
-        anomalies = predictions == -1
+        # Predictions are the sign of the decision function, so one evaluation gives both
+        scores = self.model.decision_function(X)
+        anomalies = scores <= 0
         return anomalies, scores
     
     def get_feature_importance(self, df: pd.DataFrame, anomaly_indices: np.ndarray) -> Dict:
-        numeric_df = df.select_dtypes(include=[np.number])
-        
-        if numeric_df.empty or len(anomaly_indices) == 0:
-            return {}
-        
-        importance = {}
-        for col in numeric_df.columns:
-            anomaly_mean = numeric_df.loc[anomaly_indices, col].mean()
-            normal_mean = numeric_df.loc[~anomaly_indices, col].mean()
-            importance[col] = abs(anomaly_mean - normal_mean)
-        
-        total = sum(importance.values())
-        if total > 0:
-            importance = {k: v/total for k, v in importance.items()}
-        
-        return dict(sorted(importance.items(), key=lambda x: x[1], reverse=True))
+        return mean_gap_importance(df, anomaly_indices)
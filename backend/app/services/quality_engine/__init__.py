@@ -2,5 +2,6 @@ from .completeness import CompletenessAnalyzer
 from .consistency import ConsistencyAnalyzer
 from .accuracy import AccuracyAnalyzer
 from .uniqueness import UniquenessAnalyzer
+from .column_stats import ColumnStats
 
-__all__ = ['CompletenessAnalyzer', 'ConsistencyAnalyzer', 'AccuracyAnalyzer', 'UniquenessAnalyzer']
\ No newline at end of file
+__all__ = ['CompletenessAnalyzer', 'ConsistencyAnalyzer', 'AccuracyAnalyzer', 'UniquenessAnalyzer', 'ColumnStats']
\ No newline at end of file
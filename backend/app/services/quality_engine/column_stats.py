@@ -0,0 +1,39 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from functools import cached_property
+from typing import Optional
+
+class ColumnStats:
+    """Per-column counts shared by an analyzer's checks, each computed over the whole frame on first use"""
+    
+    def __init__(self, df: pd.DataFrame, table: Optional[pa.Table] = None):
+        self.df = df
+        # The Arrow table the frame was read from, when the caller has it; its data columns come first
+        # in frame order, any stored index columns after them
+        self.columns = table.columns[:len(df.columns)] if table is not None else None
+    
+    @cached_property
+    def null_counts(self) -> pd.Series:
+        if self.columns is not None:
+            # Arrow keeps each column's null count alongside its validity bitmap, so no mask is built
+            return pd.Series([column.null_count for column in self.columns], index=self.df.columns)
+        return len(self.df) - self.non_null_counts
+    
+    @cached_property
+    def non_null_counts(self) -> pd.Series:
+        if self.columns is not None:
+            return len(self.df) - self.null_counts
+        return self.df.count()
+    
+    @cached_property
+    def nuniques(self) -> pd.Series:
+        if self.columns is None:
+            return self.df.nunique()
+        # Arrow's hash kernel counts distinct values on the column buffers without boxing each one;
+        # dictionary-encoded columns are counted by pandas, since their unused entries must not count
+        return pd.Series([
+            pc.count_distinct(column, mode='only_valid').as_py()
+            if not pa.types.is_dictionary(column.type) else self.df.iloc[:, i].nunique()
+            for i, column in enumerate(self.columns)
+        ], index=self.df.columns)
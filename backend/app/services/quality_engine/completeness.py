@@ -1,53 +1,77 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional
+from .column_stats import ColumnStats
+
+# Rows per block of the missing mask; float32 counts are exact far beyond this
+MASK_BLOCK_ROWS = 65536
 
 class CompletenessAnalyzer:
-    def analyze(self, df: pd.DataFrame) -> Dict:
+    def analyze(self, df: pd.DataFrame, stats: Optional[ColumnStats] = None) -> Dict:
+        # Callers holding the Arrow table pass stats that take their counts from it
+        stats = stats or ColumnStats(df)
+        null_counts = stats.null_counts
         results = {
-            'overall_completeness': self._calculate_overall_completeness(df),
-            'column_completeness': self._analyze_columns(df),
-            'missing_patterns': self._detect_missing_patterns(df),
+            'overall_completeness': self._calculate_overall_completeness(df, null_counts),
+            'column_completeness': self._analyze_columns(df, stats),
+            'missing_patterns': self._detect_missing_patterns(df, null_counts),
             'recommendations': []
         }
         results['recommendations'] = self._generate_recommendations(results)
         return results
     
-    def _calculate_overall_completeness(self, df: pd.DataFrame) -> float:
+    def _calculate_overall_completeness(self, df: pd.DataFrame, null_counts: pd.Series) -> float:
         total_cells = df.size
-        non_null_cells = df.count().sum()
+        non_null_cells = total_cells - int(null_counts.sum())
         return (non_null_cells / total_cells) * 100 if total_cells > 0 else 0.0
     
-    def _analyze_columns(self, df: pd.DataFrame) -> Dict:
+    def _analyze_columns(self, df: pd.DataFrame, stats: ColumnStats) -> Dict:
         column_stats = {}
-        for col in df.columns:
-            missing_count = df[col].isnull().sum()
-            missing_pct = (missing_count / len(df)) * 100 if len(df) > 0 else 0.0
+        # Counts and percentages for every column come from frame-wide arrays read in step with the
+        # columns, rather than one label lookup per column in each Series
+        null_counts = stats.null_counts.to_numpy()
+        missing_pcts = null_counts / len(df) * 100 if len(df) > 0 else np.zeros(len(null_counts))
+        for col, dtype, missing_count, missing_pct, unique_values in zip(
+            df.columns, df.dtypes.astype(str), null_counts, missing_pcts, stats.nuniques.to_numpy()
+        ):
             column_stats[col] = {
                 'missing_count': int(missing_count),
-                'missing_percentage': round(missing_pct, 2),
-                'completeness_score': round(100 - missing_pct, 2),
-                'data_type': str(df[col].dtype),
-                'unique_values': int(df[col].nunique())
+                'missing_percentage': round(float(missing_pct), 2),
+                'completeness_score': round(100 - float(missing_pct), 2),
+                'data_type': dtype,
+                'unique_values': int(unique_values)
             }
         return column_stats
     
-    def _detect_missing_patterns(self, df: pd.DataFrame) -> List[Dict]:
+    def _detect_missing_patterns(self, df: pd.DataFrame, null_counts: pd.Series) -> List[Dict]:
         patterns = []
-        missing_matrix = df.isnull().astype(int)
-        for i, col1 in enumerate(df.columns):
-            for col2 in df.columns[i+1:]:
-                overlap = (missing_matrix[col1] & missing_matrix[col2]).sum()
-                if overlap > 0:
-                    total_missing = missing_matrix[col1].sum() + missing_matrix[col2].sum()
-                    jaccard = overlap / (total_missing - overlap) if total_missing > overlap else 0
-                    if jaccard > 0.5:
-                        patterns.append({
-                            'columns': [col1, col2],
-                            'overlap_count': int(overlap),
-                            'similarity_score': round(jaccard, 3),
-                            'pattern_type': 'correlated_missing'
-                        })
+        # Columns without gaps cannot overlap with any other, so only the rest get a missing mask
+        gappy = [col for col in df.columns if null_counts[col] > 0]
+        if len(gappy) < 2:
+            return patterns
+        
+        # Every pairwise overlap at once as M.T @ M over the missing mask; the mask is built one block of rows
+        # at a time, so neither it nor its float32 copy is ever held for the whole frame, and each block's
+        # counts are exact before they are summed as integers
+        gappy_df = df[gappy]
+        overlaps = np.zeros((len(gappy), len(gappy)), dtype=np.int64)
+        for start in range(0, len(gappy_df), MASK_BLOCK_ROWS):
+            block = gappy_df.iloc[start:start + MASK_BLOCK_ROWS].isnull().to_numpy(dtype=np.float32)
+            overlaps += (block.T @ block).astype(np.int64)
+        
+        # Jaccard similarity of each pair's missing rows; only the pairs above the threshold reach Python
+        totals = np.diag(overlaps)
+        unions = totals[:, None] + totals[None, :] - overlaps
+        rows, cols = np.triu_indices(len(gappy), k=1)
+        pair_overlaps = overlaps[rows, cols]
+        jaccards = pair_overlaps / unions[rows, cols]
+        for k in np.flatnonzero((pair_overlaps > 0) & (jaccards > 0.5)):
+            patterns.append({
+                'columns': [gappy[rows[k]], gappy[cols[k]]],
+                'overlap_count': int(pair_overlaps[k]),
+                'similarity_score': round(float(jaccards[k]), 3),
+                'pattern_type': 'correlated_missing'
+            })
         return patterns
     
     def _generate_recommendations(self, results: Dict) -> List[str]:
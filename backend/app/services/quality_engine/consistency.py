@@ -1,7 +1,15 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List
 import re
+from typing import Dict, List
+
+# Compiled once at import and handed to the str accessor, so no check looks them up per column
+_DIGIT_RE = re.compile(r'\d')
+_ALPHA_RE = re.compile(r'[a-zA-Z]')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# Value types in the order their codes are assigned by the type consistency check
+TYPE_NAMES = ('numeric', 'date', 'text')
 
 class ConsistencyAnalyzer:
     def analyze(self, df: pd.DataFrame) -> Dict:
@@ -17,66 +25,62 @@ class ConsistencyAnalyzer:
     def _check_format_consistency(self, df: pd.DataFrame) -> Dict:
         format_issues = {}
         for col in df.select_dtypes(include=['object']).columns:
-            patterns = {}
-            for val in df[col].dropna().unique():
-                val_str = str(val)
-                pattern = self._extract_pattern(val_str)
-                patterns[pattern] = patterns.get(pattern, 0) + 1
+            # Each distinct value is masked once through the vectorized str accessor: digits to N, letters to A
+            values = pd.Series(df[col].dropna().unique()).astype(str)
+            masked = values.str.replace(_DIGIT_RE, 'N', regex=True).str.replace(_ALPHA_RE, 'A', regex=True)
+            # Counted by pandas' hash table and ordered most common first, so the score is read off the head
+            pattern_counts = masked.value_counts()
             
-            if len(patterns) > 1:
+            if len(pattern_counts) > 1:
                 format_issues[col] = {
-                    'pattern_count': len(patterns),
-                    'patterns': patterns,
-                    'consistency_score': round((max(patterns.values()) / sum(patterns.values())) * 100, 2)
+                    'pattern_count': len(pattern_counts),
+                    'patterns': {pattern: int(count) for pattern, count in pattern_counts.items()},
+                    'consistency_score': round((pattern_counts.iat[0] / len(masked)) * 100, 2)
                 }
         return format_issues
     
-    def _extract_pattern(self, value: str) -> str:
-        pattern = re.sub(r'\d', 'N', value)
-        pattern = re.sub(r'[a-zA-Z]', 'A', pattern)
-        return pattern
-    
     def _check_value_consistency(self, df: pd.DataFrame) -> Dict:
         inconsistencies = {}
         for col in df.select_dtypes(include=['object']).columns:
-            unique_vals = df[col].dropna().unique()
-            normalized_vals = {}
-            for val in unique_vals:
-                normalized = str(val).strip().lower()
-                if normalized in normalized_vals:
-                    inconsistencies.setdefault(col, []).append({
-                        'original_values': [normalized_vals[normalized], val],
-                        'issue': 'case_or_whitespace_difference'
-                    })
-                else:
-                    normalized_vals[normalized] = val
+            # Distinct values are normalized together and grouped by the result, so every spelling that
+            # collides on a key is reported in one entry rather than only as pairs with the first
+            values = pd.Series(df[col].dropna().unique())
+            keys = values.astype(str).str.strip().str.lower()
+            collided = keys.duplicated(keep=False)
+            if not collided.any():
+                continue
+            inconsistencies[col] = [
+                {
+                    'original_values': originals.tolist(),
+                    'issue': 'case_or_whitespace_difference'
+                }
+                for _, originals in values[collided].groupby(keys[collided], sort=False)
+            ]
         return inconsistencies
     
     def _check_type_consistency(self, df: pd.DataFrame) -> Dict:
         type_issues = {}
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                type_distribution = {}
-                for val in df[col].dropna():
-                    val_type = self._infer_type(val)
-                    type_distribution[val_type] = type_distribution.get(val_type, 0) + 1
-                
-                if len(type_distribution) > 1:
-                    type_issues[col] = {
-                        'mixed_types': type_distribution,
-                        'dominant_type': max(type_distribution, key=type_distribution.get)
-                    }
+        for col in df.select_dtypes(include=['object']).columns:
+            # Each distinct value is classified once, numeric first, then a leading ISO date, else text,
+            # and weighted by how often it occurs
+            counts = df[col].value_counts(sort=False)
+            values = pd.Series(counts.index, dtype=object)
+            is_numeric = pd.to_numeric(values, errors='coerce').notna().to_numpy()
+            is_date = values.astype(str).str.match(_DATE_RE).to_numpy()
+            # Type codes index TYPE_NAMES, and one weighted bincount totals the rows of each type
+            codes = np.select([is_numeric, is_date], [0, 1], 2)
+            totals = np.bincount(codes, weights=counts.to_numpy(), minlength=len(TYPE_NAMES))
+            type_distribution = {
+                val_type: int(total) for val_type, total in zip(TYPE_NAMES, totals) if total > 0
+            }
+            
+            if len(type_distribution) > 1:
+                type_issues[col] = {
+                    'mixed_types': type_distribution,
+                    'dominant_type': max(type_distribution, key=type_distribution.get)
+                }
         return type_issues
     
-    def _infer_type(self, value):
-        try:
-            float(value)
-            return 'numeric'
-        except:
-            if re.match(r'^\d{4}-\d{2}-\d{2}', str(value)):
-                return 'date'
-            return 'text'
-    
     def _generate_recommendations(self, results: Dict) -> List[str]:
         recommendations = []
         if results['format_consistency']:
@@ -1,14 +1,25 @@
+import os
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from collections import Counter
+from .column_stats import ColumnStats
+
+# The four analyzers already run at once in their own processes, so each takes its share of the cores
+COLUMN_WORKERS = max(1, (os.cpu_count() or 1) // 4)
+
+# Past this many columns duplicate rows are found by row hashes
+WIDE_FRAME_COLUMNS = 32
 
 class UniquenessAnalyzer:
-    def analyze(self, df: pd.DataFrame) -> Dict:
+    def analyze(self, df: pd.DataFrame, stats: Optional[ColumnStats] = None) -> Dict:
+        # Both per-column checks read the same non-null and distinct counts, so each is computed once
+        stats = stats or ColumnStats(df)
         results = {
             'duplicate_rows': self._check_duplicate_rows(df),
-            'duplicate_values': self._check_duplicate_values(df),
-            'uniqueness_scores': self._calculate_uniqueness_scores(df),
+            'duplicate_values': self._check_duplicate_values(df, stats),
+            'uniqueness_scores': self._calculate_uniqueness_scores(df, stats),
             'recommendations': []
         }
         results['recommendations'] = self._generate_recommendations(results)
@@ -16,7 +27,12 @@ class UniquenessAnalyzer:
     
     def _check_duplicate_rows(self, df: pd.DataFrame) -> Dict:
         total_rows = len(df)
-        duplicate_rows = df.duplicated().sum()
+        if df.shape[1] > WIDE_FRAME_COLUMNS:
+            # One uint64 hash per row, combined column by column, so duplicates are found in a single
+            # integer hash table rather than by factorizing every column of a wide frame
+            duplicate_rows = pd.util.hash_pandas_object(df, index=False).duplicated().sum()
+        else:
+            duplicate_rows = df.duplicated().sum()
         unique_rows = total_rows - duplicate_rows
         
         return {
@@ -27,26 +43,47 @@ class UniquenessAnalyzer:
             'uniqueness_score': round((unique_rows / total_rows) * 100, 2) if total_rows > 0 else 0.0
         }
     
-    def _check_duplicate_values(self, df: pd.DataFrame) -> Dict:
+    def _check_duplicate_values(self, df: pd.DataFrame, stats: ColumnStats) -> Dict:
         duplicate_info = {}
-        for col in df.columns:
-            value_counts = df[col].value_counts()
+        # A column with as many distinct values as non-null ones has nothing repeated, so key-like
+        # columns never get their value counts built
+        totals = stats.non_null_counts
+        uniques = stats.nuniques
+        candidates = [col for col in df.columns if uniques[col] != totals[col]]
+        
+        def count_duplicates(col):
+            value_counts = df[col].value_counts(sort=False)
             duplicates = value_counts[value_counts > 1]
-            
-            if len(duplicates) > 0:
-                duplicate_info[col] = {
-                    'duplicate_value_count': len(duplicates),
-                    'total_duplicate_occurrences': int(duplicates.sum()),
-                    'most_common': duplicates.head(5).to_dict(),
-                    'unique_percentage': round((df[col].nunique() / len(df)) * 100, 2)
-                }
+            if len(duplicates) == 0:
+                return None
+            return {
+                'duplicate_value_count': len(duplicates),
+                'total_duplicate_occurrences': int(duplicates.sum()),
+                # Only the five largest counts are selected rather than sorting them all
+                'most_common': duplicates.nlargest(5).to_dict(),
+                'unique_percentage': round((uniques[col] / len(df)) * 100, 2)
+            }
+        
+        # Columns are counted side by side; pandas hashes numeric columns without holding the GIL
+        if COLUMN_WORKERS > 1 and len(candidates) > 1:
+            with ThreadPoolExecutor(max_workers=min(COLUMN_WORKERS, len(candidates))) as executor:
+                counted = list(executor.map(count_duplicates, candidates))
+        else:
+            counted = [count_duplicates(col) for col in candidates]
+        
+        for col, info in zip(candidates, counted):
+            if info is not None:
+                duplicate_info[col] = info
         return duplicate_info
     
-    def _calculate_uniqueness_scores(self, df: pd.DataFrame) -> Dict:
+    def _calculate_uniqueness_scores(self, df: pd.DataFrame, stats: ColumnStats) -> Dict:
         scores = {}
+        # Column-wise reductions over the whole frame instead of a dropna copy per column
+        totals = stats.non_null_counts
+        uniques = stats.nuniques
         for col in df.columns:
-            total_values = len(df[col].dropna())
-            unique_values = df[col].nunique()
+            total_values = int(totals[col])
+            unique_values = int(uniques[col])
             
             scores[col] = {
                 'total_values': total_values,
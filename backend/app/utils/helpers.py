@@ -0,0 +1,57 @@
+import asyncio
+import os
+import orjson
+from typing import Any, AsyncIterator, Callable
+
+# Bounds how many CPU-heavy jobs the API runs at once, whatever the number of concurrent requests
+cpu_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_SSE_END = object()
+
+async def run_blocking(func: Callable, *args: Any) -> Any:
+    """Run a blocking call in a worker thread so the event loop keeps serving requests"""
+    async with cpu_semaphore:
+        return await asyncio.to_thread(func, *args)
+
+def sse_event(payload: Any) -> bytes:
+    """Frame a payload as one server-sent event, encoded by orjson"""
+    return _SSE_PREFIX + orjson.dumps(payload) + _SSE_SUFFIX
+
+async def coalesce_sse(events: AsyncIterator[Any], max_events: int = 32, max_delay: float = 0.02) -> AsyncIterator[bytes]:
+    """Frame events as server-sent events, writing those that arrive within max_delay of each other as one chunk"""
+    queue = asyncio.Queue()
+    
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+        finally:
+            await queue.put(_SSE_END)
+    
+    # The source runs as its own task so waiting on the queue with a timeout never cancels it mid-event
+    producer = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            event = await queue.get()
+            if event is _SSE_END:
+                break
+            frames = [sse_event(event)]
+            deadline = loop.time() + max_delay
+            while len(frames) < max_events:
+                try:
+                    event = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if event is _SSE_END:
+                    break
+                frames.append(sse_event(event))
+            yield b"".join(frames)
+            if event is _SSE_END:
+                break
+        # Re-raises anything the source failed with
+        await producer
+    finally:
+        producer.cancel()
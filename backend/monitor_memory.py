@@ -5,30 +5,52 @@ import psutil
 import time
 import subprocess
 
-def check_memory():
+CHECK_INTERVAL = 60  # seconds between checks
+REDISCOVER_EVERY = 10  # checks between full process scans, to pick up runners Ollama started since
+
+def find_ollama():
+    """Scan the process table once for Ollama's server and model runners"""
+    return [proc for proc in psutil.process_iter(['name']) if 'ollama' in (proc.info['name'] or '').lower()]
+
+def check_memory(ollama_procs):
+    """Print memory use; returns whether enough is free and whether every cached Ollama process still runs"""
     mem = psutil.virtual_memory()
     print(f"Total: {mem.total / (1024**3):.1f}GB")
     print(f"Available: {mem.available / (1024**3):.1f}GB")
     print(f"Used: {mem.percent}%")
     
-    # Find Ollama process
-    for proc in psutil.process_iter(['name', 'memory_info']):
-        if 'ollama' in proc.info['name'].lower():
-            mem_mb = proc.info['memory_info'].rss / (1024**2)
+    # The cached handles are read directly rather than walking every process again
+    alive = True
+    for proc in ollama_procs:
+        try:
+            mem_mb = proc.memory_info().rss / (1024**2)
             print(f"Ollama: {mem_mb:.0f}MB")
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            alive = False
     
     if mem.available < 1.5 * (1024**3):  # Less than 1.5GB
         print("⚠️  LOW MEMORY! Consider restarting Ollama")
-        return False
-    return True
+        return False, alive
+    return True, alive
 
 if __name__ == "__main__":
+    ollama_procs = find_ollama()
+    checks = 0
+    next_check = time.monotonic()
     while True:
         print("\n" + "="*50)
-        if not check_memory():
+        healthy, alive = check_memory(ollama_procs)
+        checks += 1
+        if not healthy:
             print("\nRestarting Ollama...")
             subprocess.run(["taskkill", "/F", "/IM", "ollama.exe"])
             time.sleep(3)
             subprocess.Popen(["ollama", "serve"])
-        time.sleep(60)  # Check every minute
-
+            alive = False
+        if not alive or not ollama_procs or checks % REDISCOVER_EVERY == 0:
+            ollama_procs = find_ollama()
+        
+        # Scheduled from a monotonic clock, so time spent checking or restarting does not push later checks back;
+        # a schedule that has fallen behind (e.g. after a suspend) restarts from now instead of catching up
+        next_check = max(next_check + CHECK_INTERVAL, time.monotonic())
+        time.sleep(max(0.0, next_check - time.monotonic()))
@@ -1,4 +1,6 @@
 @echo off
+rem Let the server decode several requests at once instead of queueing them
+set OLLAMA_NUM_PARALLEL=4
 :loop
 timeout /t 1800
 taskkill /F /IM ollama.exe
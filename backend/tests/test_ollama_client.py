@@ -0,0 +1,26 @@
+from app.services.llm_engine.ollama_client import BATCH_KEYS, OllamaClient
+
+# A strategy reply cut off by the token budget partway through its strategies list
+TRUNCATED_STRATEGY = """Here is the plan:
+{
+  "priority_ranking": [
+    {"issue": "completeness", "severity": "high", "impact": "high"}
+  ],
+  "strategies": [
+    {
+      "issue_type": "completeness",
+      "affected_columns": ["age"],
+      "root_cause": "optional form fi"""
+
+def test_truncated_strategy_is_not_parsed():
+    result = OllamaClient()._parse_response(TRUNCATED_STRATEGY)
+    assert result["parsed"] is False
+    assert result["raw_response"] == TRUNCATED_STRATEGY
+
+def test_brace_in_prose_before_strategy():
+    reply = 'Use {column} names as given. {"priority_ranking": [], "strategies": []} Done.'
+    assert OllamaClient()._parse_response(reply) == {"priority_ranking": [], "strategies": []}
+
+def test_batch_needs_datasets_key():
+    reply = '{"priority_ranking": [], "strategies": []}'
+    assert OllamaClient()._parse_response(reply, BATCH_KEYS)["parsed"] is False